@@ -3,10 +3,101 @@ User authentication and management system
 """
 import os
 import json
+import hmac
 import hashlib
 import getpass
+from collections import OrderedDict
+from contextlib import contextmanager
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda obj: json.dumps(obj, indent=2).encode()
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHash
+    # OWASP Argon2id profile: 46 MiB memory, 2 iterations, 1 lane
+    _password_hasher = PasswordHasher(time_cost=2, memory_cost=46 * 1024, parallelism=1)
+except ImportError:
+    _password_hasher = None
+
+ARGON2_PREFIX = "$argon2"
+
+# scrypt fallback parameters: 16 MiB of memory per hash
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+
+# Failed logins per user before cached results are dropped
+MAX_FAILED_ATTEMPTS = 5
+
+# Successful verifications remembered, keyed by credential
+VERIFY_CACHE_SIZE = 128
+
+# Per-process key so cached entries hold an HMAC tag, never the password
+_CACHE_KEY = os.urandom(32)
+
+# {(username, stored_hash, salt): HMAC tag of the password that matched}
+_verified: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+
+# Compact the journal once it holds this many entries per user
+JOURNAL_COMPACT_RATIO = 4
+
+# Parsed users files: {path: (st_mtime_ns, st_size, users_data)}
+_USERS_CACHE: Dict[str, Tuple[int, int, List[Dict]]] = {}
+
+def _legacy_hash(password: str) -> str:
+    """Unsalted SHA-256 hash used by older users files"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def _scrypt_hash(password: str, salt: bytes) -> str:
+    """Salted scrypt hash used when Argon2 is not installed"""
+    return hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R,
+                          p=SCRYPT_P, dklen=32).hex()
+
+def _password_tag(password: str) -> bytes:
+    """Keyed digest of a password, safe to keep in memory and compare"""
+    return hmac.new(_CACHE_KEY, password.encode(), hashlib.sha256).digest()
+
+def _verify(username: str, password: str, stored_hash: str, salt: str = "") -> bool:
+    """Check a password against a stored hash, remembering successes"""
+    key = (username, stored_hash, salt)
+    tag = _password_tag(password)
+    cached = _verified.get(key)
+    if cached is not None and hmac.compare_digest(cached, tag):
+        _verified.move_to_end(key)
+        return True
+    
+    if not _check_hash(password, stored_hash, salt):
+        return False
+    
+    _verified[key] = tag
+    _verified.move_to_end(key)
+    if len(_verified) > VERIFY_CACHE_SIZE:
+        _verified.popitem(last=False)
+    return True
+
+def _check_hash(password: str, stored_hash: str, salt: str) -> bool:
+    """Run the (slow) hash comparison for a password"""
+    if stored_hash.startswith(ARGON2_PREFIX):
+        if _password_hasher is None:
+            return False
+        try:
+            return _password_hasher.verify(stored_hash, password)
+        except (VerificationError, InvalidHash):
+            return False
+    
+    if salt:
+        return hmac.compare_digest(stored_hash, _scrypt_hash(password, bytes.fromhex(salt)))
+    
+    return hmac.compare_digest(stored_hash, _legacy_hash(password))
 
 class PermissionLevel(Enum):
     """User permission levels"""
@@ -17,24 +108,64 @@ class PermissionLevel(Enum):
     def __str__(self):
         return self.name
 
+# Precomputed name <-> level tables for (de)serialization
+_LEVEL_BY_NAME = {m.name: m for m in PermissionLevel}
+_NAME_BY_LEVEL = {m: m.name for m in PermissionLevel}
+
 class User:
     """User account information"""
-    def __init__(self, username: str, password_hash: str, permission_level: PermissionLevel):
+    __slots__ = ('username', 'password_hash', 'permission_level', 'salt')
+    
+    def __init__(self, username: str, password_hash: str, permission_level: PermissionLevel,
+                 salt: str = ""):
         self.username = username
         self.password_hash = password_hash
         self.permission_level = permission_level
+        self.salt = salt  # hex scrypt salt; empty for Argon2 and legacy hashes
     
     @staticmethod
-    def hash_password(password: str) -> str:
-        """Create a secure hash of the password"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def hash_password(password: str, salt: Optional[bytes] = None) -> str:
+        """
+        Create a secure hash of the password
+        
+        Argon2id embeds its own salt; a salt selects the scrypt fallback.
+        """
+        if salt is not None:
+            return _scrypt_hash(password, salt)
+        if _password_hasher is not None:
+            return _password_hasher.hash(password)
+        raise ValueError("A salt is required when Argon2 is not available")
+    
+    def set_password(self, password: str):
+        """Hash and store a new password with the best available scheme"""
+        if _password_hasher is not None:
+            self.salt = ""
+            self.password_hash = User.hash_password(password)
+        else:
+            salt = os.urandom(SALT_BYTES)
+            self.salt = salt.hex()
+            self.password_hash = User.hash_password(password, salt)
+    
+    def verify_password(self, password: str) -> bool:
+        """Check a password against the stored hash"""
+        return _verify(self.username, password, self.password_hash, self.salt)
+    
+    def needs_rehash(self) -> bool:
+        """Check whether the stored hash should be upgraded"""
+        if _password_hasher is None:
+            # Only unsalted legacy hashes are upgraded (to scrypt)
+            return not self.salt and not self.password_hash.startswith(ARGON2_PREFIX)
+        if not self.password_hash.startswith(ARGON2_PREFIX):
+            return True
+        return _password_hasher.check_needs_rehash(self.password_hash)
     
     def to_dict(self) -> Dict:
         """Convert user to dictionary for serialization"""
         return {
             "username": self.username,
             "password_hash": self.password_hash,
-            "permission_level": self.permission_level.name
+            "salt": self.salt,
+            "permission_level": _NAME_BY_LEVEL[self.permission_level]
         }
     
     @classmethod
@@ -43,7 +174,8 @@ class User:
         return cls(
             username=data["username"],
             password_hash=data["password_hash"],
-            permission_level=PermissionLevel[data["permission_level"]]
+            permission_level=_LEVEL_BY_NAME[data["permission_level"]],
+            salt=data.get("salt", "")
         )
 
 
@@ -52,6 +184,12 @@ class UserManager:
     def __init__(self, users_file: str = None):
         self.users: Dict[str, User] = {}
         self.current_user: Optional[User] = None
+        self.failed_attempts: Dict[str, int] = {}
+        
+        # Deferred-write state for batched mutations
+        self._dirty = False
+        self._batch_depth = 0
+        self._dir_created = False
         
         if users_file is None:
             # Default location for users file
@@ -59,7 +197,15 @@ class UserManager:
         else:
             self.users_file = users_file
         
+        # Append-only journal of mutations made since the last compaction
+        self.journal_file = os.path.splitext(self.users_file)[0] + ".log"
+        self._journal_fp = None
+        self._journal_entries = 0
+        # Set when the journal had entries that could not be replayed
+        self._journal_damaged = False
+        
         self.load_users()
+        self._replay_journal()
         
         # If no users exist, create default admin
         if not self.users:
@@ -69,38 +215,188 @@ class UserManager:
         """Create default admin account"""
         admin_user = User(
             username="admin",
-            password_hash=User.hash_password("admin"),
+            password_hash="",
             permission_level=PermissionLevel.ADMIN
         )
+        admin_user.set_password("admin")
         self.users["admin"] = admin_user
-        self.save_users()
+        self._record_upsert(admin_user)
         print("Created default admin account (username: admin, password: admin)")
     
     def load_users(self):
         """Load users from file"""
         if os.path.exists(self.users_file):
             try:
-                with open(self.users_file, 'r') as f:
-                    users_data = json.load(f)
-                    for user_data in users_data:
-                        user = User.from_dict(user_data)
-                        self.users[user.username] = user
+                st = os.stat(self.users_file)
+                cached = _USERS_CACHE.get(self.users_file)
+                if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+                    users_data = cached[2]
+                else:
+                    with open(self.users_file, 'rb') as f:
+                        users_data = _loads(f.read())
+                    _USERS_CACHE[self.users_file] = (st.st_mtime_ns, st.st_size, users_data)
+                
+                for user_data in users_data:
+                    user = User.from_dict(user_data)
+                    self.users[user.username] = user
             except Exception as e:
                 print(f"Error loading users: {e}")
                 print("Creating new users file...")
         
-    def save_users(self):
-        """Save users to file"""
+    def save_users(self) -> bool:
+        """Save users to file, returning whether the new file is in place"""
         try:
             users_data = [user.to_dict() for user in self.users.values()]
             
             # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.users_file), exist_ok=True)
+            if not self._dir_created:
+                os.makedirs(os.path.dirname(self.users_file), exist_ok=True)
+                self._dir_created = True
             
-            with open(self.users_file, 'w') as f:
-                json.dump(users_data, f, indent=4)
+            # Write to a temporary file and swap it in atomically
+            tmp_file = self.users_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(users_data))
+            os.replace(tmp_file, self.users_file)
+            
+            # Keep the parse cache in step with what was just written
+            st = os.stat(self.users_file)
+            _USERS_CACHE[self.users_file] = (st.st_mtime_ns, st.st_size, users_data)
         except Exception as e:
             print(f"Error saving users: {e}")
+            return False
+        return True
+    
+    def _replay_journal(self):
+        """Apply journaled mutations on top of the loaded users, then compact"""
+        if not os.path.exists(self.journal_file):
+            return
+        
+        try:
+            with open(self.journal_file, 'r') as f:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = _loads(line)
+                        if entry["op"] == "upsert":
+                            user = User.from_dict(entry["user"])
+                            self.users[user.username] = user
+                        elif entry["op"] == "delete":
+                            self.users.pop(entry["username"], None)
+                    except Exception as e:
+                        # Skip the bad entry but keep applying the ones after it
+                        print(f"Error replaying users journal line {line_no}: {e}")
+                        self._journal_damaged = True
+                        continue
+                    self._journal_entries += 1
+        except Exception as e:
+            print(f"Error replaying users journal: {e}")
+            self._journal_damaged = True
+        
+        if self._journal_entries:
+            self._compact()
+    
+    def _record_upsert(self, user: User):
+        """Journal a created or modified user"""
+        self._record({"op": "upsert", "user": user.to_dict()})
+    
+    def _record_delete(self, username: str):
+        """Journal a removed user"""
+        self._record({"op": "delete", "username": username})
+    
+    def _record(self, entry: Dict):
+        """Append one mutation to the journal, flushing unless inside a batch"""
+        try:
+            if self._journal_fp is not None and not self._journal_is_current():
+                # Another shell compacted the journal away; appending to the
+                # unlinked file would lose the entry
+                self._journal_fp.close()
+                self._journal_fp = None
+            if self._journal_fp is None:
+                if not self._dir_created:
+                    os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+                    self._dir_created = True
+                self._journal_fp = open(self.journal_file, 'a', buffering=8192)
+                # Terminate a torn last line so new entries don't run into it
+                if self._journal_fp.tell() and not self._journal_ends_with_newline():
+                    self._journal_fp.write("\n")
+            self._journal_fp.write(json.dumps(entry) + "\n")
+            self._journal_entries += 1
+        except Exception as e:
+            print(f"Error saving users: {e}")
+            return
+        
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.flush()
+    
+    def _journal_is_current(self) -> bool:
+        """Whether the open journal is still the file at journal_file"""
+        try:
+            on_disk = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(self._journal_fp.fileno())
+        return (opened.st_ino, opened.st_dev) == (on_disk.st_ino, on_disk.st_dev)
+    
+    def _journal_ends_with_newline(self) -> bool:
+        """Whether the journal on disk ends with a complete line"""
+        with open(self.journal_file, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+    
+    def _compact(self):
+        """Fold the journal into users.json and start a fresh journal"""
+        # Compacting would discard whatever could not be replayed, so keep
+        # the journal as it is until it can be read cleanly
+        if self._journal_damaged:
+            return
+        # The journal is the only copy of these changes until the save lands
+        if not self.save_users():
+            return
+        try:
+            if self._journal_fp is not None:
+                self._journal_fp.close()
+                self._journal_fp = None
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._journal_entries = 0
+        except Exception as e:
+            print(f"Error compacting users journal: {e}")
+    
+    @contextmanager
+    def batch(self):
+        """Coalesce all user changes made inside the block into one flush"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self.flush()
+    
+    def flush(self):
+        """Push journaled changes to the OS, compacting when the journal grows"""
+        if self._journal_fp is not None:
+            self._journal_fp.flush()
+        self._dirty = False
+        
+        if self._journal_entries > JOURNAL_COMPACT_RATIO * max(len(self.users), 1):
+            self._compact()
+    
+    def sync(self):
+        """Flush and fsync the journal so changes survive a crash"""
+        self.flush()
+        if self._journal_fp is not None:
+            os.fsync(self._journal_fp.fileno())
+    
+    def close(self):
+        """Sync and release the journal file"""
+        self.sync()
+        if self._journal_fp is not None:
+            self._journal_fp.close()
+            self._journal_fp = None
     
     def authenticate(self, username: str, password: str) -> bool:
         """Authenticate a user with username and password"""
@@ -108,13 +404,24 @@ class UserManager:
             return False
         
         user = self.users[username]
-        password_hash = User.hash_password(password)
         
-        if user.password_hash == password_hash:
-            self.current_user = user
-            return True
+        if not user.verify_password(password):
+            # Repeated failures drop cached results so guesses can't probe the cache
+            self.failed_attempts[username] = self.failed_attempts.get(username, 0) + 1
+            if self.failed_attempts[username] >= MAX_FAILED_ATTEMPTS:
+                _verified.clear()
+                self.failed_attempts[username] = 0
+            return False
         
-        return False
+        self.failed_attempts.pop(username, None)
+        
+        # Migrate legacy SHA-256 entries (or outdated parameters) on login
+        if user.needs_rehash():
+            user.set_password(password)
+            self._record_upsert(user)
+        
+        self.current_user = user
+        return True
     
     def login(self) -> bool:
         """Interactive login prompt"""
@@ -143,6 +450,7 @@ class UserManager:
     def logout(self):
         """Log out the current user"""
         self.current_user = None
+        self.sync()
     
     def add_user(self, username: str, password: str, permission_level: PermissionLevel) -> bool:
         """Add a new user (requires admin)"""
@@ -152,12 +460,14 @@ class UserManager:
         
         user = User(
             username=username,
-            password_hash=User.hash_password(password),
+            password_hash="",
             permission_level=permission_level
         )
+        user.set_password(password)
         
         self.users[username] = user
-        self.save_users()
+        _verified.clear()
+        self._record_upsert(user)
         return True
     
     def remove_user(self, username: str) -> bool:
@@ -166,7 +476,9 @@ class UserManager:
             return False
         
         del self.users[username]
-        self.save_users()
+        self.failed_attempts.pop(username, None)
+        _verified.clear()
+        self._record_delete(username)
         return True
     
     def change_password(self, username: str, new_password: str) -> bool:
@@ -175,8 +487,9 @@ class UserManager:
             return False
         
         user = self.users[username]
-        user.password_hash = User.hash_password(new_password)
-        self.save_users()
+        user.set_password(new_password)
+        _verified.clear()
+        self._record_upsert(user)
         return True
     
     def get_users_list(self) -> List[Dict]:
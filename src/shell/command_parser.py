@@ -1,9 +1,109 @@
 """
 Command parsing functionality
 """
+import re
+from functools import lru_cache
 from typing import List, Tuple
 
+_ALLOWED_COMMANDS = frozenset({
+    'cd', 'pwd', 'exit', 'echo', 'clear', 
+    'ls', 'cat', 'mkdir', 'rmdir', 'rm', 
+    'touch', 'kill', 'sleep', 'jobs', 'bg',
+    'fg', 'roundrobin', 'priority', 'paging',
+    'philosophers', 'history', 'grep', 'sort',
+    'wc', 'head', 'tail', 'useradd', 'userdel', 
+    'passwd', 'chmod', 'whoami', 'logout', 'users',
+    'help'
+})
+
+# Pieces of a shell word, plus the separators between words:
+# double-quoted (with \" and \\ escapes), single-quoted, a bare pipe,
+# whitespace, and plain text. Outside quotes a backslash is literal, so
+# Windows paths survive, and an unmatched quote is kept as plain text.
+_TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|\'([^\']*)\'|(\|)|(\s+)|([^\s|"\']+|["\'])',
+                       re.DOTALL)
+
+# Backslash escapes that are honoured inside double quotes
+_DQ_ESCAPE_RE = re.compile(r'\\(["\\])')
+
+def _fold(command):
+    """Normalize a command name for lookup"""
+    # ASCII fast path; casefold handles the rest
+    return command.lower() if command.isascii() else command.casefold()
+
+def parse_int(s):
+    """Parse a signed integer argument, returning None if it is not one"""
+    # A str check up front avoids raising and catching ValueError
+    digits = s[1:] if s[:1] in ("-", "+") else s
+    return int(s) if digits.isdecimal() else None
+
+def parse_float(s):
+    """Parse a non-negative decimal argument, returning None if it is not one"""
+    return float(s) if s.replace(".", "", 1).isdecimal() else None
+
+@lru_cache(maxsize=64)
+def _parse(input_string):
+    """Tokenize a command line into (command, args_tuple)"""
+    parts = input_string.strip().split()
+    if not parts:
+        return "", ()
+    
+    return _fold(parts[0]), tuple(parts[1:])
+
+@lru_cache(maxsize=64)
+def _parse_stages(input_string):
+    r"""
+    Tokenize a command line into a tuple of (command, args_tuple) stages
+    
+    Quoted words are split like shlex.split() in POSIX mode, with a bare
+    '|' also ending a word and starting a new stage. Unlike shlex, a
+    backslash outside double quotes and an unmatched quote are plain
+    text, so unquoted input splits on whitespace and pipes as it always
+    has. Run the examples with python -m doctest:
+    
+    >>> import shlex
+    >>> cases = ['echo "a b" c', "echo 'a | b'", 'echo "say \\"hi\\"" x',
+    ...          'echo "" \'\'', 'echo pre"fix"post', 'echo "a\\nb"']
+    >>> all(_parse_stages(c) == (('echo', tuple(shlex.split(c)[1:])),) for c in cases)
+    True
+    >>> _parse_stages(r'cd C:\Users\bob')
+    (('cd', ('C:\\Users\\bob',)),)
+    >>> _parse_stages("echo don't")
+    (('echo', ("don't",)),)
+    >>> _parse_stages('echo "unterminated')
+    (('echo', ('"unterminated',)),)
+    >>> _parse_stages('cat f.txt | grep "a b"|sort')
+    (('cat', ('f.txt',)), ('grep', ('a b',)), ('sort', ()))
+    """
+    stages = []
+    stage = []
+    word = None  # Word being built from adjacent pieces
+    
+    # Single pass: quoted pieces keep their spaces and pipes
+    for double, single, pipe, space, bare in _TOKEN_RE.findall(input_string):
+        if pipe or space:
+            if word is not None:
+                stage.append(word)
+                word = None
+            if pipe and stage:
+                stages.append((_fold(stage[0]), tuple(stage[1:])))
+                stage = []
+        else:
+            if double:
+                double = _DQ_ESCAPE_RE.sub(r'\1', double)
+            word = (word or "") + (double or single or bare)
+    
+    if word is not None:
+        stage.append(word)
+    if stage:
+        stages.append((_fold(stage[0]), tuple(stage[1:])))
+    
+    return tuple(stages)
+
 class CommandParser:
+    # Names accepted by validate_command, for callers checking many at once
+    known_commands = _ALLOWED_COMMANDS
+    
     def parse(self, input_string):
         """
         Parse input string into command and arguments
@@ -14,14 +114,8 @@ class CommandParser:
         Returns:
             tuple: (command, list_of_args)
         """
-        parts = input_string.strip().split()
-        if not parts:
-            return "", []
-        
-        command = parts[0].lower()
-        args = parts[1:] if len(parts) > 1 else []
-        
-        return command, args
+        command, args = _parse(input_string)
+        return command, list(args)
     
     def parse_pipeline(self, input_string) -> List[Tuple[str, List[str]]]:
         """
@@ -33,32 +127,20 @@ class CommandParser:
         Returns:
             List of (command, args) tuples representing the pipeline
         """
-        # Split the input by pipe symbol
-        pipeline_parts = input_string.split('|')
-        pipeline = []
-        
-        for part in pipeline_parts:
-            part = part.strip()
-            if not part:
-                continue
-                
-            command, args = self.parse(part)
-            pipeline.append((command, args))
+        return [(command, list(args)) for command, args in _parse_stages(input_string)]
+    
+    def parse_any(self, input_string) -> List[Tuple[str, List[str]]]:
+        """
+        Parse a command line, with or without pipes, in a single tokenization
         
-        return pipeline
+        Args:
+            input_string: User input string
+            
+        Returns:
+            List of (command, args) tuples; a single entry when there is no pipe
+        """
+        return self.parse_pipeline(input_string)
 
     def validate_command(self, command):
         """Validates the command against a list of allowed commands."""
-        allowed_commands = [
-            'cd', 'pwd', 'exit', 'echo', 'clear', 
-            'ls', 'cat', 'mkdir', 'rmdir', 'rm', 
-            'touch', 'kill', 'sleep', 'jobs', 'bg',
-            'fg', 'roundrobin', 'priority', 'paging',
-            'philosophers', 'history', 'grep', 'sort',
-            'wc', 'head', 'tail', 'useradd', 'userdel', 
-            'passwd', 'chmod', 'whoami', 'logout', 'users',
-            'help'# Added user management commands
-        ]
-        if command in allowed_commands:
-            return True
-        return False
\ No newline at end of file
+        return command in _ALLOWED_COMMANDS
\ No newline at end of file
@@ -6,6 +6,9 @@ import sys
 from pathlib import Path
 from utils.error_handler import handle_error
 
+# The home directory does not change for the life of the process
+_HOME = str(Path.home())
+
 def change_directory(current_dir, args):
     """
     Change the current working directory
@@ -20,20 +23,13 @@ def change_directory(current_dir, args):
     try:
         # If no path provided, go to home directory
         if not args:
-            new_dir = str(Path.home())
+            new_dir = _HOME
         else:
-            path = args[0]
-            
-            # Handle home directory shortcut
-            if path.startswith('~'):
-                path = str(Path.home()) + path[1:]
+            # Handle home directory shortcuts (~ and ~user)
+            path = os.path.expanduser(args[0])
                 
-            # Handle absolute paths
-            if os.path.isabs(path):
-                new_dir = path
-            else:
-                # Handle relative paths
-                new_dir = os.path.join(current_dir, path)
+            # Absolute paths replace current_dir; relative ones are joined to it
+            new_dir = os.path.join(current_dir, path)
                 
         # Normalize the path to handle '..' and '.'
         new_dir = os.path.normpath(new_dir)
@@ -85,18 +81,23 @@ def list_directory(current_dir, args):
             else:
                 target_dir = os.path.join(current_dir, path)
         
-        # Get directory contents
-        entries = os.listdir(target_dir)
+        # Get directory contents; DirEntry caches the type from the directory read
+        with os.scandir(target_dir) as it:
+            entries = sorted(it, key=lambda e: e.name)
         
-        # Format and display contents
-        for entry in sorted(entries):
-            full_path = os.path.join(target_dir, entry)
-            if os.path.isdir(full_path):
+        # Format and display contents in a single write
+        use_color = os.name != 'nt'
+        lines = []
+        for entry in entries:
+            if entry.is_dir():
                 # Display directories with a trailing slash
-                print(f"\033[1;34m{entry}/\033[0m" if os.name != 'nt' else f"{entry}/")
+                lines.append(f"\033[1;34m{entry.name}/\033[0m" if use_color else f"{entry.name}/")
             else:
                 # Display files normally
-                print(entry)
+                lines.append(entry.name)
+        
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
     except FileNotFoundError:
         print(f"Error: Directory not found: {target_dir}")
     except PermissionError:
@@ -1,10 +1,40 @@
 """
 File-related commands implementation
 """
+import io
 import os
 import sys
+import shutil
 from utils.error_handler import handle_error
 
+_COPY_CHUNK = 1 << 16
+_BINARY_PEEK = 4096
+
+def _stream_to_stdout(f, size):
+    """Copy an open binary file to stdout without loading it into memory"""
+    out = getattr(sys.stdout, 'buffer', None)
+    if out is None:
+        # Captured text stream (e.g. a pipeline stage)
+        sys.stdout.write(f.read().decode(errors='replace'))
+        return
+    
+    sys.stdout.flush()
+    offset = 0
+    if hasattr(os, 'sendfile'):
+        try:
+            out_fd = out.fileno()
+            while offset < size:
+                sent = os.sendfile(out_fd, f.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return
+        except (OSError, io.UnsupportedOperation):
+            f.seek(offset)
+    
+    shutil.copyfileobj(f, out, _COPY_CHUNK)
+    out.flush()
+
 def touch(current_dir, args):
     """
     Create an empty file or update the timestamp of an existing file
@@ -25,11 +55,13 @@ def touch(current_dir, args):
             filepath = filename
         else:
             filepath = os.path.join(current_dir, filename)
-            
-        with open(filepath, 'a'):
-            os.utime(filepath, None)  # Update the access/modification time
         
-        if not os.path.exists(filepath):
+        try:
+            # Existing file: just update the access/modification time
+            os.utime(filepath, None)
+        except FileNotFoundError:
+            fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | getattr(os, 'O_NOCTTY', 0), 0o666)
+            os.close(fd)
             print(f"File created: {filepath}")
     except PermissionError:
         print(f"Error: Permission denied")
@@ -65,12 +97,16 @@ def cat(current_dir, args):
             print(f"Error: {filename} is a directory")
             return
             
-        with open(filepath, 'r') as f:
-            print(f.read())
+        with open(filepath, 'rb') as f:
+            # A NUL byte near the start marks the file as binary
+            if b'\0' in f.read(_BINARY_PEEK):
+                print(f"Error: Cannot display binary file: {filename}")
+                return
+            f.seek(0)
+            _stream_to_stdout(f, os.fstat(f.fileno()).st_size)
+        print()
     except PermissionError:
         print(f"Error: Permission denied")
-    except UnicodeDecodeError:
-        print(f"Error: Cannot display binary file: {filename}")
     except Exception as e:
         handle_error(e)
 
@@ -1,21 +1,19 @@
 """Memory management simulation commands"""
+import sys
 import time
 import random
-from collections import deque
+import itertools
+from collections import deque, OrderedDict, namedtuple
 
-class Page:
-    """Memory page representation"""
-    def __init__(self, page_id, process_id, content=""):
-        self.page_id = page_id
-        self.process_id = process_id
-        self.content = content
-        self.last_accessed = 0
+# Monotonic tick for ordering events; only relative order matters
+_clock = itertools.count()
+
+class Page(namedtuple('Page', ['page_id', 'process_id'])):
+    """Lightweight memory page reference, built on demand"""
+    __slots__ = ()
         
     def __str__(self):
         return f"P{self.process_id}:Page{self.page_id}"
-        
-    def access(self):
-        self.last_accessed = time.time()
 
 class PageFrame:
     """Physical memory frame"""
@@ -26,8 +24,7 @@ class PageFrame:
         
     def load_page(self, page):
         self.page = page
-        self.allocated_time = time.time()
-        page.access()
+        self.allocated_time = next(_clock)
         
     def is_free(self):
         return self.page is None
@@ -41,47 +38,60 @@ class PageReplacement:
         self.name = algorithm
         if algorithm == "FIFO":
             self.page_queue = deque()
+            self._fifo_set = set()  # frame ids currently queued
             self.add = self._add_fifo
+            self.touch = self._touch_fifo
             self.get_victim = self._get_fifo_victim
         else:  # LRU
-            self.frames = []
+            # Frames keyed by id, least recently used first
+            self.frames = OrderedDict()
             self.add = self._add_lru
+            self.touch = self._touch_lru
             self.get_victim = self._get_lru_victim
     
     def _add_fifo(self, frame):
-        if frame not in self.page_queue:
+        if frame.frame_id not in self._fifo_set:
+            self._fifo_set.add(frame.frame_id)
             self.page_queue.append(frame)
             
+    def _touch_fifo(self, frame):
+        pass  # FIFO order ignores hits
+            
     def _get_fifo_victim(self):
-        return self.page_queue.popleft() if self.page_queue else None
+        if not self.page_queue:
+            return None
+        victim = self.page_queue.popleft()
+        self._fifo_set.discard(victim.frame_id)
+        return victim
     
     def _add_lru(self, frame):
-        if frame not in self.frames:
-            self.frames.append(frame)
+        self.frames[frame.frame_id] = frame
+        self.frames.move_to_end(frame.frame_id)
+    
+    def _touch_lru(self, frame):
+        self.frames.move_to_end(frame.frame_id)
             
     def _get_lru_victim(self):
-        if not self.frames:
-            return None
-        victim = min(self.frames, key=lambda f: f.page.last_accessed if f.page else float('inf'))
-        self.frames.remove(victim)
-        return victim
+        return self.frames.popitem(last=False)[1] if self.frames else None
 
 class Process:
     """Process with memory pages"""
     def __init__(self, process_id, num_pages):
         self.process_id = process_id
-        self.pages = [Page(i, process_id, f"Data for P{process_id}, page {i}") for i in range(num_pages)]
-        self.page_table = {i: None for i in range(num_pages)}
+        self.num_pages = num_pages
+        # Dense page table: frame id per page, None when not resident
+        self.page_table = [None] * num_pages
         
     def get_page(self, page_id):
-        return self.pages[page_id] if 0 <= page_id < len(self.pages) else None
+        return Page(page_id, self.process_id) if 0 <= page_id < self.num_pages else None
 
 class PhysicalMemory:
     """Physical memory with page frames"""
-    def __init__(self, num_frames, replacement_algorithm="FIFO"):
+    def __init__(self, num_frames, replacement_algorithm="FIFO", verbose=True):
         self.frames = [PageFrame(i) for i in range(num_frames)]
         self.replacement_algorithm = PageReplacement(replacement_algorithm)
         self.page_faults = self.hits = 0
+        self.verbose = verbose
         
     def get_free_frame(self):
         return next((frame for frame in self.frames if frame.is_free()), None)
@@ -92,7 +102,7 @@ class PhysicalMemory:
         # Check if page is already in memory
         if process.page_table[page_id] is not None:
             frame_id = process.page_table[page_id]
-            self.frames[frame_id].page.access()
+            self.replacement_algorithm.touch(self.frames[frame_id])
             self.hits += 1
             return frame_id
         
@@ -107,11 +117,9 @@ class PhysicalMemory:
             # Update page table of the process owning the evicted page
             if frame and frame.page:
                 old_pid, old_page_id = frame.page.process_id, frame.page.page_id
-                for p in self.processes:
-                    if p.process_id == old_pid:
-                        p.page_table[old_page_id] = None
-                        break
-                print(f"Replacing {frame.page} with {page} using {self.replacement_algorithm.name}")
+                self.processes[old_pid].page_table[old_page_id] = None
+                if self.verbose:
+                    print(f"Replacing {frame.page} with {page} using {self.replacement_algorithm.name}")
         
         # Load page into frame and update page table
         frame.load_page(page)
@@ -120,14 +128,26 @@ class PhysicalMemory:
         return -1  # Indicating page fault
         
     def print_state(self):
-        print("\nPhysical Memory State:")
-        print("--------------------")
-        for frame in self.frames:
-            print(frame)
+        sys.stdout.write("\nPhysical Memory State:\n--------------------\n"
+                         + "\n".join(str(f) for f in self.frames) + "\n")
+
+def generate_reference_trace(processes, total_references):
+    """Draw the whole stream of (process, page_id) references up front"""
+    chosen = random.choices(processes, k=total_references)
+    return [(p, random.randrange(p.num_pages)) for p in chosen]
 
-def simulate_memory_paging(args):
-    """Simulate memory management using paging"""
+def simulate_memory_paging(args, animate=False):
+    """
+    Simulate memory management using paging
+    
+    Args:
+        args: Command arguments [algorithm=FIFO, processes=4, frames=10, --animate]
+        animate: Print every reference and the memory state, pausing between steps
+    """
     # Parse arguments with defaults
+    if "--animate" in args:
+        animate = True
+        args = [a for a in args if a != "--animate"]
     replacement_algo = args[0].upper() if args and args[0].upper() in ["FIFO", "LRU"] else "FIFO"
     try:
         num_processes = max(1, int(args[1])) if len(args) > 1 else 4
@@ -139,38 +159,45 @@ def simulate_memory_paging(args):
     print(f"- Algorithm: {replacement_algo}, Processes: {num_processes}, Memory: {memory_size} frames")
     
     # Initialize memory and processes
-    memory = PhysicalMemory(memory_size, replacement_algo)
+    memory = PhysicalMemory(memory_size, replacement_algo, verbose=animate)
     processes = [Process(i, random.randint(2, 5)) for i in range(num_processes)]
-    memory.processes = processes
+    processes_by_id = {p.process_id: p for p in processes}
+    memory.processes = processes_by_id
     pages_in_memory = {p.process_id: 0 for p in processes}
     
     print("\nProcesses created:")
     for p in processes:
-        print(f"Process {p.process_id}: {len(p.pages)} pages")
+        print(f"Process {p.process_id}: {p.num_pages} pages")
     
     # Run simulation
     total_references = 30
     print(f"\nSimulating {total_references} memory references...")
-    time.sleep(1)
+    if animate:
+        time.sleep(1)
     
-    for i in range(total_references):
-        # Select random process and page
-        process = random.choice(processes)
-        page_id = random.randint(0, len(process.pages) - 1)
+    trace = generate_reference_trace(processes, total_references)
+    for i, (process, page_id) in enumerate(trace):
         page = process.get_page(page_id)
         
-        print(f"\nReference #{i+1}: Process {process.process_id} requests Page {page_id}")
+        if animate:
+            print(f"\nReference #{i+1}: Process {process.process_id} requests Page {page_id}")
         
         # Access the page
         result = memory.load_page(page, process)
         if result == -1:
-            print(f"PAGE FAULT: Page {page_id} of Process {process.process_id} not in memory")
             pages_in_memory[process.process_id] += 1
-        else:
-            print(f"PAGE HIT: Page {page_id} of Process {process.process_id} found in frame {result}")
         
+        if animate:
+            if result == -1:
+                print(f"PAGE FAULT: Page {page_id} of Process {process.process_id} not in memory")
+            else:
+                print(f"PAGE HIT: Page {page_id} of Process {process.process_id} found in frame {result}")
+            
+            memory.print_state()
+            time.sleep(0.5)
+    
+    if not animate:
         memory.print_state()
-        time.sleep(0.5)
     
     # Print statistics
     print("\n\nSimulation Complete!")
@@ -182,7 +209,7 @@ def simulate_memory_paging(args):
     
     print("\nMemory Usage by Process:")
     for p_id, pages in pages_in_memory.items():
-        process = next(p for p in processes if p.process_id == p_id)
-        print(f"Process {p_id}: {pages} pages in memory out of {len(process.pages)} total")
+        process = processes_by_id[p_id]
+        print(f"Process {p_id}: {pages} pages in memory out of {process.num_pages} total")
     
     return "Memory paging simulation completed."
\ No newline at end of file
@@ -2,10 +2,21 @@
 Process scheduling simulation commands
 """
 import time
+import heapq
 import random
-from collections import deque
 from dataclasses import dataclass
 from typing import List
+from ..command_parser import parse_int
+
+NS_PER_SECOND = 1_000_000_000
+
+_BURST_RANGE = range(1, 6)  # Burst times of 1-5 seconds
+_PRIORITY_RANGE = range(1, 11)  # 1 is highest priority, 10 is lowest
+
+def _draw(population, n):
+    """Draw n values uniformly from population in a single call"""
+    # random.choices samples in one batch instead of n randint() calls
+    return random.choices(population, k=n)
 
 @dataclass
 class Process:
@@ -21,12 +32,68 @@ class Process:
         if self.remaining_time is None:
             self.remaining_time = self.burst_time
 
+def _round_robin_schedule(burst_times, time_quantum, on_slice=None):
+    """
+    Compute a Round Robin schedule without sleeping or printing
+    
+    Times are plain integers in whatever unit the caller uses (the
+    simulation passes nanoseconds) so the accounting never touches floats.
+    
+    Args:
+        burst_times: Burst time per process slot
+        time_quantum: Maximum time a process runs before being requeued
+        on_slice: Optional callback(slot, execution_time, remaining) per time slice
+        
+    Returns:
+        tuple: (wait, turnaround, completion_order), indexed by slot
+    """
+    # Structure-of-Arrays state indexed by slot, plus a fixed-capacity
+    # ring buffer of slot indices as the ready queue
+    total = len(burst_times)
+    remaining = list(burst_times)
+    wait = [0] * total
+    turnaround = [0] * total
+    enqueue_time = [0] * total  # Clock value when each slot last joined the queue
+    queue = list(range(total))
+    head, size = 0, total
+    completion_order = []
+    current_time = 0
+    
+    while size:
+        idx = queue[head]
+        head = (head + 1) % total
+        size -= 1
+        
+        # Time spent queued since the last enqueue; nothing else needs updating
+        wait[idx] += current_time - enqueue_time[idx]
+        
+        if remaining[idx] <= time_quantum:
+            # Final execution for this process
+            execution_time = remaining[idx]
+            current_time += execution_time
+            remaining[idx] = 0
+            turnaround[idx] = current_time
+            completion_order.append(idx)
+        else:
+            # Process needs more time; add back to queue
+            execution_time = time_quantum
+            current_time += execution_time
+            remaining[idx] -= execution_time
+            enqueue_time[idx] = current_time
+            queue[(head + size) % total] = idx
+            size += 1
+        
+        if on_slice is not None:
+            on_slice(idx, execution_time, remaining[idx])
+    
+    return wait, turnaround, completion_order
+
 def simulate_round_robin(args):
     """
     Simulate Round Robin scheduling algorithm
     
     Args:
-        args: Command arguments [num_processes=10, time_quantum=1]
+        args: Command arguments [num_processes=10, time_quantum=1, --no-sleep]
         
     Returns:
         Simulation results
@@ -35,22 +102,28 @@ def simulate_round_robin(args):
     num_processes = 10  # Default
     time_quantum = 1  # Default time quantum in seconds
     
+    # Analytical mode computes the schedule without real-time sleeps
+    analytical = "--no-sleep" in args
+    if analytical:
+        args = [a for a in args if a != "--no-sleep"]
+    
     if args and len(args) >= 1:
-        try:
-            num_processes = int(args[0])
-        except ValueError:
+        num_processes = parse_int(args[0])
+        if num_processes is None:
             return f"Error: Invalid number of processes: {args[0]}"
     
     if args and len(args) >= 2:
-        try:
-            time_quantum = int(args[1])
-        except ValueError:
+        time_quantum = parse_int(args[1])
+        if time_quantum is None:
             return f"Error: Invalid time quantum: {args[1]}"
     
+    if time_quantum < 1:
+        return f"Error: Time quantum must be at least 1: {time_quantum}"
+    
     # Create processes with random burst times between 1-5 seconds
     processes = [
-        Process(id=i, burst_time=random.randint(1, 5))
-        for i in range(1, num_processes + 1)
+        Process(id=i, burst_time=burst)
+        for i, burst in enumerate(_draw(_BURST_RANGE, num_processes), 1)
     ]
     
     total_processes = len(processes)
@@ -60,65 +133,44 @@ def simulate_round_robin(args):
         print(f"{p.id}\t\t{p.burst_time}s\t\t{p.remaining_time}s")
     print("\nStarting simulation...\n")
     
-    # Prepare process queue
-    ready_queue = deque(processes)
-    completed_processes = []
-    current_time = 0
-    
-    # Run the simulation
-    while ready_queue:
-        current_process = ready_queue.popleft()
-        
-        # If this is the final execution for this process
-        if current_process.remaining_time <= time_quantum:
-            execution_time = current_process.remaining_time
-            print(f"Running Process {current_process.id} for {execution_time}s [COMPLETING]")
-            
-            # Simulate process running
-            time.sleep(execution_time)
-            
-            # Update metrics
-            current_time += execution_time
-            current_process.remaining_time = 0
-            current_process.turnaround_time = current_time
-            
-            # Add to completed list
-            completed_processes.append(current_process)
-            
+    def run_slice(idx, execution_ns, remaining_ns):
+        process = processes[idx]
+        execution_time = execution_ns / NS_PER_SECOND
+        if remaining_ns == 0:
+            print(f"Running Process {process.id} for {execution_time:g}s [COMPLETING]")
         else:
-            # Process needs more time
-            execution_time = time_quantum
-            print(f"Running Process {current_process.id} for {execution_time}s [remaining: {current_process.remaining_time - execution_time}s]")
-            
-            # Simulate process running
-            time.sleep(execution_time)
-            
-            # Update metrics
-            current_time += execution_time
-            current_process.remaining_time -= execution_time
-            
-            # Add back to queue
-            ready_queue.append(current_process)
-            
-        # Update wait times for all processes in the queue
-        for p in ready_queue:
-            p.wait_time += execution_time
+            print(f"Running Process {process.id} for {execution_time:g}s [remaining: {remaining_ns / NS_PER_SECOND:g}s]")
+        
+        # Simulate process running
+        time.sleep(execution_time)
+    
+    # Run the simulation on integer nanoseconds
+    wait_ns, turnaround_ns, completion_order = _round_robin_schedule(
+        [p.burst_time * NS_PER_SECOND for p in processes],
+        time_quantum * NS_PER_SECOND,
+        on_slice=None if analytical else run_slice
+    )
+    
+    # Copy the arrays back onto the process records, in seconds, for reporting
+    completed_processes = []
+    for idx in completion_order:
+        p = processes[idx]
+        p.remaining_time = 0
+        p.wait_time = wait_ns[idx] / NS_PER_SECOND
+        p.turnaround_time = turnaround_ns[idx] / NS_PER_SECOND
+        completed_processes.append(p)
     
     # Calculate and print metrics
     print("\nSimulation complete!\n")
     print("Process metrics:")
     print("Process ID\tBurst Time\tWait Time\tTurnaround Time")
     
-    total_wait_time = 0
-    total_turnaround_time = 0
-    
     for p in completed_processes:
-        print(f"{p.id}\t\t{p.burst_time}s\t\t{p.wait_time}s\t\t{p.turnaround_time}s")
-        total_wait_time += p.wait_time
-        total_turnaround_time += p.turnaround_time
+        print(f"{p.id}\t\t{p.burst_time}s\t\t{p.wait_time:g}s\t\t{p.turnaround_time:g}s")
     
-    avg_wait_time = total_wait_time / total_processes
-    avg_turnaround_time = total_turnaround_time / total_processes
+    # Reduce over the flat arrays rather than the process records
+    avg_wait_time = sum(wait_ns) / total_processes / NS_PER_SECOND
+    avg_turnaround_time = sum(turnaround_ns) / total_processes / NS_PER_SECOND
     
     print(f"\nAverage Wait Time: {avg_wait_time:.2f}s")
     print(f"Average Turnaround Time: {avg_turnaround_time:.2f}s")
@@ -139,20 +191,20 @@ def simulate_priority(args):
     num_processes = 10  # Default
     
     if args and len(args) >= 1:
-        try:
-            num_processes = int(args[0])
-        except ValueError:
+        num_processes = parse_int(args[0])
+        if num_processes is None:
             return f"Error: Invalid number of processes: {args[0]}"
     
-    # Create processes with random burst times and priorities
-    processes = [
-        Process(
-            id=i, 
-            burst_time=random.randint(1, 5),
-            priority=random.randint(1, 10)  # 1 is highest priority, 10 is lowest
-        )
-        for i in range(1, num_processes + 1)
-    ]
+    # Create processes with random burst times and priorities, keeping a
+    # min-heap of (priority, id, process) as the ready set
+    processes = []
+    ready_heap = []
+    bursts = _draw(_BURST_RANGE, num_processes)
+    priorities = _draw(_PRIORITY_RANGE, num_processes)
+    for i, (burst, priority) in enumerate(zip(bursts, priorities), 1):
+        process = Process(id=i, burst_time=burst, priority=priority)
+        processes.append(process)
+        heapq.heappush(ready_heap, (process.priority, process.id, process))
     
     total_processes = len(processes)
     print(f"Simulating Priority scheduling with {total_processes} processes")
@@ -161,14 +213,14 @@ def simulate_priority(args):
         print(f"{p.id}\t\t{p.burst_time}s\t\t{p.priority}")
     print("\nStarting simulation...\n")
     
-    # Sort processes by priority (lower value = higher priority)
-    sorted_processes = sorted(processes, key=lambda p: p.priority)
-    
     completed_processes = []
+    wait = []
+    turnaround = []
     current_time = 0
     
-    # Run the simulation
-    for process in sorted_processes:
+    # Run the simulation, always picking the highest priority (lowest value)
+    while ready_heap:
+        _, _, process = heapq.heappop(ready_heap)
         print(f"Running Process {process.id} (priority: {process.priority}) for {process.burst_time}s")
         
         # Calculate wait time for this process
@@ -184,22 +236,20 @@ def simulate_priority(args):
         
         # Add to completed list
         completed_processes.append(process)
+        wait.append(process.wait_time)
+        turnaround.append(process.turnaround_time)
     
     # Calculate and print metrics
     print("\nSimulation complete!\n")
     print("Process metrics:")
     print("Process ID\tBurst Time\tPriority\tWait Time\tTurnaround Time")
     
-    total_wait_time = 0
-    total_turnaround_time = 0
-    
     for p in completed_processes:
         print(f"{p.id}\t\t{p.burst_time}s\t\t{p.priority}\t\t{p.wait_time}s\t\t{p.turnaround_time}s")
-        total_wait_time += p.wait_time
-        total_turnaround_time += p.turnaround_time
     
-    avg_wait_time = total_wait_time / total_processes
-    avg_turnaround_time = total_turnaround_time / total_processes
+    # Reduce over the flat arrays rather than the process records
+    avg_wait_time = sum(wait) / total_processes
+    avg_turnaround_time = sum(turnaround) / total_processes
     
     print(f"\nAverage Wait Time: {avg_wait_time:.2f}s")
     print(f"Average Turnaround Time: {avg_turnaround_time:.2f}s")
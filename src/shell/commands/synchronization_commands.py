@@ -1,6 +1,7 @@
 """
 Process synchronization simulation commands
 """
+import sys
 import time
 import random
 import threading
@@ -11,6 +12,13 @@ class State(Enum):
     HUNGRY = 2
     EATING = 3
 
+# Display label for each state, padded to a common width and indexed by
+# State.value - 1
+_GLYPHS = ("🤔 Thinking", "😋 Hungry  ", "🍽️  Eating  ")
+
+# Fork column, indexed by whether the philosopher holds that fork
+_FORK_GLYPHS = ("  ", "🍴")
+
 class Fork:
     """Represents a fork (mutex)"""
     def __init__(self, id):
@@ -28,16 +36,21 @@ class Fork:
         self.owner = None
         self.lock.release()
 
+    def is_free(self):
+        return self.owner is None
+
 class Philosopher(threading.Thread):
     """Represents a philosopher in the dining philosophers problem"""
-    def __init__(self, id, left_fork, right_fork, state_lock, run_time, monitor):
+    def __init__(self, id, left_fork, right_fork, state_lock, stop, monitor):
         super().__init__()
         self.id = id
         self.left_fork = left_fork
         self.right_fork = right_fork
         self.state = State.THINKING
+        # Shared Condition: guards states/forks and is notified when forks are released
         self.state_lock = state_lock
-        self.run_time = run_time
+        # Set once by the simulation timer (or on interrupt) to end the run
+        self.stop = stop
         self.eating_count = 0
         self.thinking_time = self.hungry_time = self.eating_time = 0
         self.monitor = monitor
@@ -60,64 +73,85 @@ class Philosopher(threading.Thread):
     def change_state(self, new_state):
         with self.state_lock:
             self.state = new_state
-            self.monitor.update_display()
+        # Only flag a repaint; the monitor's renderer thread does the drawing
+        self.monitor.dirty.set()
+
+    def _can_eat(self):
+        return self.first_fork.is_free() and self.second_fork.is_free()
 
     def try_to_eat(self):
         self.change_state(State.HUNGRY)
         hungry_start = time.time()
 
-        # Try to get first fork
-        if not self.first_fork.pick_up(self.id):
-            self.hungry_time += time.time() - hungry_start
-            return False
-            
-        time.sleep(0.1)  # Visualization delay
-
-        # Try to get second fork
-        if not self.second_fork.pick_up(self.id):
-            self.first_fork.put_down()
-            self.hungry_time += time.time() - hungry_start
-            return False
+        # Block until both forks are free instead of polling; neighbours
+        # notify the condition when they put their forks down
+        with self.state_lock:
+            while not self._can_eat():
+                self.state_lock.wait(timeout=1.0)
+            self.first_fork.pick_up(self.id)
+            self.second_fork.pick_up(self.id)
+        self.hungry_time += time.time() - hungry_start
 
         self.eat()
-        self.second_fork.put_down()
-        self.first_fork.put_down()
+        with self.state_lock:
+            self.second_fork.put_down()
+            self.first_fork.put_down()
+            self.state_lock.notify_all()
         return True
 
     def run(self):
-        start_time = time.time()
-        while time.time() - start_time < self.run_time:
+        while not self.stop.is_set():
             self.think()
-            while not self.try_to_eat():
-                time.sleep(0.1)
+            self.try_to_eat()
 
 class DiningPhilosophersMonitor:
     """Displays the state of the dining philosophers"""
+    REFRESH_INTERVAL = 0.1  # Minimum seconds between repaints
+
     def __init__(self, philosophers, forks):
         self.philosophers = philosophers
         self.forks = forks
-        self.display_lock = threading.Lock()
+        # Set by state changes; the renderer repaints at most every REFRESH_INTERVAL
+        self.dirty = threading.Event()
+        self.running = False
+        self._renderer = None
+
+    def start(self):
+        """Start the background renderer thread"""
+        self.running = True
+        self._renderer = threading.Thread(target=self._render_loop, daemon=True)
+        self._renderer.start()
+
+    def stop(self):
+        """Stop the renderer thread and wait for it to exit"""
+        self.running = False
+        self.dirty.set()  # Wake the renderer so it can observe the stop
+        if self._renderer is not None:
+            self._renderer.join()
+            self._renderer = None
+
+    def _render_loop(self):
+        while self.running:
+            self.dirty.wait()
+            if not self.running:
+                break
+            self.dirty.clear()
+            self.update_display()
+            time.sleep(self.REFRESH_INTERVAL)
 
     def update_display(self):
-        with self.display_lock:
-            print("\033[H\033[J", end="")  # Clear screen
-            print("\n=== DINING PHILOSOPHERS SIMULATION ===\n")
-            
-            for i, p in enumerate(self.philosophers):
-                left = "🍴" if self.forks[i].owner == p.id else "  "
-                right = "🍴" if self.forks[(i+1) % len(self.forks)].owner == p.id else "  "
-                
-                # Show state with emoji
-                if p.state == State.THINKING:
-                    state = "🤔 Thinking"
-                elif p.state == State.HUNGRY:
-                    state = "😋 Hungry  "
-                else:
-                    state = "🍽️  Eating  "
-                
-                print(f"Philosopher {i}: {left} {state} {right} | Meals: {p.eating_count}")
-            
-            print("----------------------------------------")
+        # Clear screen and build the whole frame for a single write
+        buf = ["\033[H\033[J\n=== DINING PHILOSOPHERS SIMULATION ===\n\n"]
+        
+        for i, p in enumerate(self.philosophers):
+            left = _FORK_GLYPHS[self.forks[i].owner == p.id]
+            right = _FORK_GLYPHS[self.forks[(i+1) % len(self.forks)].owner == p.id]
+            state = _GLYPHS[p.state.value - 1]
+            buf.append(f"Philosopher {i}: {left} {state} {right} | Meals: {p.eating_count}\n")
+        
+        buf.append("----------------------------------------\n")
+        sys.stdout.write("".join(buf))
+        sys.stdout.flush()
 
 def simulate_dining_philosophers(args):
     """Simulate the dining philosophers problem"""
@@ -142,29 +176,32 @@ def simulate_dining_philosophers(args):
     
     # Create resources
     forks = [Fork(i) for i in range(num_philosophers)]
-    state_lock = threading.Lock()
+    state_lock = threading.Condition()
+    stop = threading.Event()
+    timer = threading.Timer(simulation_time, stop.set)
+    timer.daemon = True
     monitor = DiningPhilosophersMonitor([], forks)
     
     # Create and start philosophers
     philosophers = [
         Philosopher(i, forks[i], forks[(i+1) % num_philosophers], 
-                   state_lock, simulation_time, monitor)
+                   state_lock, stop, monitor)
         for i in range(num_philosophers)
     ]
     monitor.philosophers = philosophers
     
     try:
+        monitor.start()
+        timer.start()
         for p in philosophers:
             p.start()
         
-        # Main simulation loop
-        start_time = time.time()
-        while time.time() - start_time < simulation_time:
-            monitor.update_display()
-            time.sleep(0.5)
-        
+        # One timer ends the run; nudge the renderer while waiting for it
+        while not stop.wait(timeout=0.5):
+            monitor.dirty.set()
         for p in philosophers:
             p.join()
+        monitor.stop()
         
         # Final stats
         monitor.update_display()
@@ -185,6 +222,9 @@ def simulate_dining_philosophers(args):
             print("\nResource distribution was fair. No starvation detected.")
             
     except KeyboardInterrupt:
+        stop.set()
+        timer.cancel()
+        monitor.stop()
         print("\nSimulation interrupted!")
     
     return "Dining Philosophers simulation completed."
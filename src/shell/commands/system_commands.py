@@ -7,14 +7,137 @@ import signal
 import time
 import subprocess
 import threading
-from collections import namedtuple
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
 from utils.error_handler import handle_error
+from ..command_parser import parse_int, parse_float
+
+@dataclass(slots=True)
+class Job:
+    """Background job record; status is updated in place"""
+    id: int
+    pid: int
+    command: str
+    process: Any
+    status: str
+    completed_at: Optional[float] = None
 
 # Global job management
-Job = namedtuple('Job', ['id', 'pid', 'command', 'process', 'status'])
-_jobs = {}
+_jobs: Dict[int, Job] = {}
+_jobs_lock = threading.Lock()
 _job_counter = 0
 
+# POSIX: one reaper thread waits on every child and reaps only our own.
+# Needs waitid() to peek at an exit without reaping it (not on macOS/Windows).
+_HAVE_WAITID = hasattr(os, 'waitid')
+_pid_to_job: Dict[int, Job] = {}
+_job_event = threading.Condition(_jobs_lock)  # Job registered or completed
+_reaper = None
+_FOREIGN_BACKOFF = 0.05  # Seconds to let another waiter reap its own child
+
+def _finish_job(job, returncode):
+    """Record a job's completion; caller holds _jobs_lock"""
+    # Popen.wait()/communicate() return early once returncode is set
+    job.process.returncode = returncode
+    job.status = "completed"
+    job.completed_at = time.time()
+
+def _reap_job(pid):
+    """Reap a registered job that is known to have exited"""
+    try:
+        _, wait_status = os.waitpid(pid, 0)
+        returncode = os.waitstatus_to_exitcode(wait_status)
+    except ChildProcessError:
+        # Already reaped elsewhere; the exit status is gone
+        returncode = None
+    
+    with _jobs_lock:
+        job = _pid_to_job.pop(pid, None)
+        if job is not None:
+            _finish_job(job, returncode)
+            _job_event.notify_all()
+
+def _poll_jobs():
+    """Reap any registered jobs that have exited, without blocking"""
+    with _jobs_lock:
+        pids = list(_pid_to_job)
+    
+    for pid in pids:
+        try:
+            if os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+                _reap_job(pid)
+        except ChildProcessError:
+            _reap_job(pid)
+
+def _reap():
+    """Wait for any child to exit and reap it if it belongs to a job"""
+    while True:
+        with _jobs_lock:
+            while not _pid_to_job:
+                _job_event.wait()
+        
+        try:
+            # WNOWAIT leaves the child waitable, so children started by
+            # os.system()/subprocess.run() are still reaped by their owner
+            info = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOWAIT)
+        except ChildProcessError:
+            # No children left, so anything still mapped has been reaped elsewhere
+            with _jobs_lock:
+                for job in _pid_to_job.values():
+                    job.status = "completed"
+                    job.completed_at = time.time()
+                _pid_to_job.clear()
+                _job_event.notify_all()
+            continue
+        
+        with _jobs_lock:
+            ours = info.si_pid in _pid_to_job
+        
+        if ours:
+            _reap_job(info.si_pid)
+        else:
+            # Someone else's child (or a job not registered yet). It stays a
+            # zombie until its owner waits, so check our jobs directly meanwhile.
+            _poll_jobs()
+            time.sleep(_FOREIGN_BACKOFF)
+
+def _watch_job(job):
+    """Register a job for completion tracking"""
+    global _reaper
+    
+    if not _HAVE_WAITID:
+        # Without waitid() keep a monitor thread per process
+        def monitor_job():
+            job.process.wait()
+            with _jobs_lock:
+                job.status = "completed"
+                job.completed_at = time.time()
+                _job_event.notify_all()
+        
+        threading.Thread(target=monitor_job, daemon=True).start()
+        return
+    
+    with _jobs_lock:
+        # A job that exited before this point is still a zombie, so the
+        # reaper picks it up on its next waitid()
+        _pid_to_job[job.pid] = job
+        _job_event.notify_all()
+        
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap, daemon=True)
+            _reaper.start()
+
+def _wait_for_job(job):
+    """Block until a background job has exited"""
+    if not _HAVE_WAITID:
+        job.process.wait()
+        return
+    
+    # Leave the waitpid() to the reaper so the exit status is not lost
+    with _jobs_lock:
+        while job.status != "completed":
+            _job_event.wait()
+
 def echo(args):
     """
     Display a line of text
@@ -28,6 +151,37 @@ def clear_screen():
     """Clear the terminal screen"""
     os.system('cls' if os.name == 'nt' else 'clear')
 
+# Win32 constants for process termination
+_PROCESS_TERMINATE = 0x0001
+_ERROR_INVALID_PARAMETER = 87
+
+def _terminate_windows_process(pid):
+    """Terminate a process directly through the Win32 API (no shell)"""
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    
+    # Declare signatures so 64-bit handles are not truncated to a C int
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    kernel32.TerminateProcess.restype = wintypes.BOOL
+    kernel32.TerminateProcess.argtypes = (wintypes.HANDLE, wintypes.UINT)
+    kernel32.CloseHandle.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    
+    handle = kernel32.OpenProcess(_PROCESS_TERMINATE, False, pid)
+    if not handle:
+        error = ctypes.get_last_error()
+        if error == _ERROR_INVALID_PARAMETER:
+            raise ProcessLookupError(pid)
+        raise ctypes.WinError(error)
+    
+    try:
+        if not kernel32.TerminateProcess(handle, 1):
+            raise ctypes.WinError(ctypes.get_last_error())
+    finally:
+        kernel32.CloseHandle(handle)
+
 def kill_process(args):
     """
     Kill a process by PID
@@ -39,18 +193,19 @@ def kill_process(args):
         print("Error: kill requires a PID")
         return
     
+    pid = parse_int(args[0])
+    if pid is None:
+        print(f"Error: Invalid PID: {args[0]}")
+        return
+    
     try:
-        pid = int(args[0])
-        
         if os.name == 'nt':
-            # On Windows, we use taskkill
-            os.system(f"taskkill /F /PID {pid}")
+            # On Windows, terminate through the Win32 API
+            _terminate_windows_process(pid)
         else:
             # On Unix-like systems, we can use the signal module
             os.kill(pid, signal.SIGKILL)
         print(f"Process {pid} terminated")
-    except ValueError:
-        print(f"Error: Invalid PID: {args[0]}")
     except ProcessLookupError:
         print(f"Error: No process with PID {pid}")
     except PermissionError:
@@ -130,25 +285,19 @@ def run_in_background(command, args):
             )
         
         # Increment job counter and add to jobs list
-        _job_counter += 1
-        job_id = _job_counter
-        _jobs[job_id] = Job(
-            id=job_id,
-            pid=process.pid,
-            command=cmd_str,
-            process=process,
-            status="running"
-        )
-        
-        # Start a thread to monitor process completion
-        def monitor_job():
-            process.wait()
-            if job_id in _jobs:
-                _jobs[job_id] = _jobs[job_id]._replace(status="completed")
+        with _jobs_lock:
+            _job_counter += 1
+            job_id = _job_counter
+            job = _jobs[job_id] = Job(
+                id=job_id,
+                pid=process.pid,
+                command=cmd_str,
+                process=process,
+                status="running"
+            )
         
-        monitor_thread = threading.Thread(target=monitor_job)
-        monitor_thread.daemon = True
-        monitor_thread.start()
+        # Completion is recorded by the reaper (or a monitor thread on Windows)
+        _watch_job(job)
         
         return f"[{job_id}] {process.pid}"
     
@@ -169,9 +318,11 @@ def sleep_command(args):
     if not args:
         return "Error: sleep requires seconds argument"
     
+    seconds = parse_float(args[0])
+    if seconds is None:
+        return f"Error: Invalid time value: {args[0]}"
+    
     try:
-        seconds = float(args[0])
-        
         # Check if we need to run in background
         if len(args) > 1 and args[-1] == '&':
             return run_in_background('sleep', [str(seconds)])
@@ -180,8 +331,6 @@ def sleep_command(args):
         time.sleep(seconds)
         return f"Slept for {seconds} seconds"
     
-    except ValueError:
-        return f"Error: Invalid time value: {args[0]}"
     except Exception as e:
         handle_error(e)
         return f"Error in sleep command: {str(e)}"
@@ -193,18 +342,14 @@ def jobs_command(_=None):
     Returns:
         List of all background jobs
     """
-    if not _jobs:
+    # Completion is recorded by each job's monitor thread, so no polling here
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    
+    if not jobs:
         return "No jobs running"
     
-    result = []
-    for job_id, job in _jobs.items():
-        # Check if process is still running
-        if job.process.poll() is not None and job.status == "running":
-            _jobs[job_id] = job._replace(status="completed")
-        
-        result.append(f"[{job.id}] {job.status} {job.pid} {job.command}")
-
-    return "\n".join(result)
+    return "\n".join(f"[{job.id}] {job.status} {job.pid} {job.command}" for job in jobs)
 
 def bg_command(args):
     """
@@ -219,8 +364,11 @@ def bg_command(args):
     if not args:
         return "Error: bg requires a job ID"
     
+    job_id = parse_int(args[0].strip("[]"))
+    if job_id is None:
+        return f"Error: Invalid job ID: {args[0]}"
+    
     try:
-        job_id = int(args[0].strip("[]"))
         if job_id not in _jobs:
             return f"Error: No such job {job_id}"
         
@@ -234,11 +382,10 @@ def bg_command(args):
             return f"Error: bg not fully supported on Windows"
         else:
             os.killpg(os.getpgid(job.pid), signal.SIGCONT)
-            _jobs[job_id] = job._replace(status="running")
+            with _jobs_lock:
+                job.status = "running"
             return f"[{job_id}] {job.command} &"
     
-    except ValueError:
-        return f"Error: Invalid job ID: {args[0]}"
     except Exception as e:
         handle_error(e)
         return f"Error in bg command: {str(e)}"
@@ -256,8 +403,11 @@ def fg_command(args):
     if not args:
         return "Error: fg requires a job ID"
     
+    job_id = parse_int(args[0].strip("[]"))
+    if job_id is None:
+        return f"Error: Invalid job ID: {args[0]}"
+    
     try:
-        job_id = int(args[0].strip("[]"))
         if job_id not in _jobs:
             return f"Error: No such job {job_id}"
         
@@ -271,27 +421,29 @@ def fg_command(args):
         print(f"{job.command}")
         
         # Check if process is still running
-        if job.process.poll() is None:
+        if job.status != "completed":
             try:
-                job.process.wait()
+                _wait_for_job(job)
             except KeyboardInterrupt:
                 # Handle Ctrl+Z to stop the job
                 if os.name != 'nt':
                     os.killpg(os.getpgid(job.pid), signal.SIGTSTP)
-                    _jobs[job_id] = job._replace(status="stopped")
+                    with _jobs_lock:
+                        job.status = "stopped"
                     return f"\n[{job_id}] Stopped {job.command}"
         
         # If we get here, the process completed
         output, error = job.process.communicate()
         if job.process.returncode == 0:
-            del _jobs[job_id]
+            with _jobs_lock:
+                _jobs.pop(job_id, None)
             return f"{output.decode('utf-8').strip()}"
         else:
-            _jobs[job_id] = job._replace(status="completed")
+            with _jobs_lock:
+                job.status = "completed"
+                job.completed_at = time.time()
             return f"Job exited with status {job.process.returncode}\n{error.decode('utf-8').strip()}"
     
-    except ValueError:
-        return f"Error: Invalid job ID: {args[0]}"
     except Exception as e:
         handle_error(e)
         return f"Error in fg command: {str(e)}"
@@ -2,12 +2,22 @@
 File permissions system
 """
 import os
+import sys
 import json
 import stat
+import threading
 from typing import Dict, Set, Optional, Tuple
 from enum import Flag, auto
 from ..auth.user_manager import User, PermissionLevel
 
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda obj: json.dumps(obj, separators=(',', ':')).encode()
+
 class FilePermission(Flag):
     """File permission flags"""
     NONE = 0
@@ -19,14 +29,18 @@ class FilePermission(Flag):
 
 class FilePermissionManager:
     """Manages file permissions for users"""
+    # Seconds to wait before writing, so bursts of changes share one write
+    FLUSH_DELAY = 0.2
+    
     def __init__(self, permissions_file: str = None):
         if permissions_file is None:
             self.permissions_file = os.path.expanduser("~/.shell_simulator_permissions.json")
         else:
             self.permissions_file = permissions_file
         
-        # Structure: {filepath: {username: permissions_int}}
-        self.file_permissions: Dict[str, Dict[str, int]] = {}
+        # Structure: {(filepath, username): permissions_int}; the file on
+        # disk keeps the nested {filepath: {username: permissions_int}} form
+        self.file_permissions: Dict[Tuple[str, str], int] = {}
         
         # Default permissions by user level
         self.default_permissions = {
@@ -34,6 +48,13 @@ class FilePermissionManager:
             PermissionLevel.STANDARD: FilePermission.READ | FilePermission.EXECUTE,
             PermissionLevel.USER: FilePermission.READ
         }
+        # Raw int form of the defaults for the check_permission fast path
+        self._default_ints = {level: flag.value for level, flag in self.default_permissions.items()}
+        
+        # Write-behind state
+        self._dirty = False
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
         
         self.load_permissions()
     
@@ -41,22 +62,62 @@ class FilePermissionManager:
         """Load permissions from file"""
         if os.path.exists(self.permissions_file):
             try:
-                with open(self.permissions_file, 'r') as f:
-                    self.file_permissions = json.load(f)
+                with open(self.permissions_file, 'rb') as f:
+                    nested = _loads(f.read())
+                self.file_permissions = {
+                    (sys.intern(filepath), username): value
+                    for filepath, users in nested.items()
+                    for username, value in users.items()
+                }
             except Exception as e:
                 print(f"Error loading file permissions: {e}")
                 print("Creating new permissions file...")
     
     def save_permissions(self):
-        """Save permissions to file"""
-        try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.permissions_file), exist_ok=True)
+        """Schedule a save; changes within FLUSH_DELAY are coalesced into one write"""
+        with self._flush_lock:
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_DELAY, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _flush(self):
+        """Write permissions to file if there are pending changes"""
+        with self._flush_lock:
+            self._flush_timer = None
+            if not self._dirty:
+                return
             
-            with open(self.permissions_file, 'w') as f:
-                json.dump(self.file_permissions, f, indent=4)
-        except Exception as e:
-            print(f"Error saving file permissions: {e}")
+            try:
+                # Create directory if it doesn't exist
+                os.makedirs(os.path.dirname(self.permissions_file), exist_ok=True)
+                
+                # Write to a temporary file and swap it in atomically
+                tmp_file = self.permissions_file + ".tmp"
+                nested: Dict[str, Dict[str, int]] = {}
+                for (filepath, username), value in self.file_permissions.items():
+                    nested.setdefault(filepath, {})[username] = value
+                with open(tmp_file, 'wb') as f:
+                    f.write(_dumps(nested))
+                os.replace(tmp_file, self.permissions_file)
+                self._dirty = False
+            except Exception as e:
+                print(f"Error saving file permissions: {e}")
+    
+    def close(self):
+        """Cancel any pending timer and write outstanding changes now"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        self._flush()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
     
     def get_permissions(self, filepath: str, user: User) -> FilePermission:
         """Get a user's permissions for a file"""
@@ -65,30 +126,44 @@ class FilePermissionManager:
             return FilePermission.ALL
         
         # Look up specific permissions for this file
-        if filepath in self.file_permissions and user.username in self.file_permissions[filepath]:
-            return FilePermission(self.file_permissions[filepath][user.username])
+        value = self.file_permissions.get((filepath, user.username))
+        if value is not None:
+            return FilePermission(value)
         
         # Use default permissions based on user level
         return self.default_permissions[user.permission_level]
     
+    def _has_perm_int(self, filepath: str, username: str, level_default_int: int,
+                      required_int: int) -> bool:
+        """Test stored (or default) permission bits against required bits"""
+        stored = self.file_permissions.get((filepath, username), level_default_int)
+        return (stored & required_int) == required_int
+    
     def check_permission(self, filepath: str, user: User, required_permission: FilePermission) -> bool:
         """Check if user has required permission for a file"""
-        permissions = self.get_permissions(filepath, user)
-        return required_permission in permissions
+        level = user.permission_level
+        # Admins always have full permissions
+        if level == PermissionLevel.ADMIN:
+            return True
+        # Compare raw ints rather than building and testing Flag instances
+        return self._has_perm_int(filepath, user.username, self._default_ints[level],
+                                  required_permission.value)
     
     def set_permissions(self, filepath: str, username: str, permissions: FilePermission) -> bool:
         """Set permissions for a specific file and user"""
-        if filepath not in self.file_permissions:
-            self.file_permissions[filepath] = {}
-        
-        self.file_permissions[filepath][username] = permissions.value
+        # The flush timer iterates the table under this lock
+        with self._flush_lock:
+            self.file_permissions[(sys.intern(filepath), username)] = permissions.value
         self.save_permissions()
         return True
     
     def remove_permissions(self, filepath: str) -> bool:
         """Remove permissions for a file"""
-        if filepath in self.file_permissions:
-            del self.file_permissions[filepath]
+        with self._flush_lock:
+            keys = [key for key in self.file_permissions if key[0] == filepath]
+            for key in keys:
+                del self.file_permissions[key]
+        if keys:
             self.save_permissions()
             return True
         return False
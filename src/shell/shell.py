@@ -2,23 +2,201 @@
 Core Shell implementation
 """
 import os
-import io
+import re
 import sys
 import getpass
+import functools
+import contextlib
+from collections import OrderedDict, deque
 from .command_parser import CommandParser
 from .auth.user_manager import UserManager, PermissionLevel
 from .permissions.file_permissions import FilePermissionManager, FilePermission, check_file_permission
+from .commands.directory_commands import change_directory, print_working_directory, list_directory, make_directory, remove_directory
+from .commands.file_commands import cat, touch, remove_file
+from .commands.system_commands import echo, clear_screen, sleep_command, jobs_command, bg_command, fg_command, kill_process
+from .commands.scheduler_commands import simulate_round_robin, simulate_priority
+from .commands.memory_commands import simulate_memory_paging
+from .commands.synchronization_commands import simulate_dining_philosophers
 from utils.error_handler import handle_error
 
+# Enum members are singletons: bind them once and compare by identity
+_ADMIN = PermissionLevel.ADMIN
+_READ = FilePermission.READ
+_WRITE = FilePermission.WRITE
+
+_READ_BUF_SIZE = 1 << 20  # Read buffer for grep and sort file reads
+
+# Shown by `help`; built once instead of printed line by line
+_HELP_TEXT = """\
+
+Available commands:
+
+File Operations:
+  ls [dir]           - List directory contents
+  cat <file>         - Display file contents
+  touch <file>       - Create an empty file
+  rm <file>          - Remove file
+
+Directory Operations:
+  pwd                - Print working directory
+  cd <dir>           - Change directory
+  mkdir <dir>        - Create directory
+  rmdir <dir>        - Remove directory
+
+User Management:
+  whoami             - Display current user
+  logout             - Log out current user
+  passwd [user]      - Change password
+  useradd <user> <level> - Add new user (admin)
+  userdel <user>     - Remove user (admin)
+  users              - List all users (admin)
+  chmod <user> <perms> <file> - Set file permissions (admin)
+
+Text Processing:
+  grep [-E] <pattern> [file] - Search for pattern (-E: regex)
+  sort [file]        - Sort lines of text
+
+System Commands:
+  echo <text>        - Display text
+  clear              - Clear screen
+  history            - Show command history
+  exit               - Exit shell
+
+Simulation Commands:
+  philosophers       - Run Dining Philosophers simulation
+  paging             - Run Memory Paging simulation
+  roundrobin         - Run Round Robin scheduling simulation
+  priority           - Run Priority scheduling simulation
+
+Pipe Support:
+  command1 | command2 | command3  - Chain commands with pipes
+
+Quoting:
+  "a b" or 'a b'     - One argument, spaces and | included
+  \\" and \\\\ in "..." - Literal " and \\; other backslashes are kept as typed
+"""
+
+def _require_admin(action):
+    """Decorate a Shell command so only administrators can run it"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.user_manager.current_user.permission_level is not _ADMIN:
+                print(f"Error: Only administrators can {action}")
+                return None
+            return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+class _ListWriter:
+    """Minimal stdout stand-in that appends every write to a list"""
+    def __init__(self, buf):
+        self.write = buf.append
+    
+    def flush(self):
+        pass
+    
+    def isatty(self):
+        return False
+
 class Shell:
+    PERM_CACHE_SIZE = 256  # Maximum cached permission check results
+    HISTORY_SIZE = 1000  # Commands kept for `history`; oldest are dropped
+    
     def __init__(self):
         self.running = True
-        self.cwd = os.getcwd()
+        self.cwd = os.getcwd()  # Also sets the join prefix; see the cwd property
         self.parser = CommandParser()
-        self.cmd_history = []
+        self.cmd_history = deque(maxlen=self.HISTORY_SIZE)
         self.user_manager = UserManager()
         self.permission_manager = FilePermissionManager()
-        
+        # os.name is fixed for the process lifetime; decide on ANSI colors once
+        self._use_color = os.name != 'nt'
+        
+        # (path, username, level, permission bits) -> (has_perm, error),
+        # least recently used first
+        self._perm_cache = OrderedDict()
+        
+        # Command name -> handler(args, input_data, out); built once so dispatch
+        # is a single dict lookup
+        self._dispatch = {
+            # User management commands
+            "useradd": self.cmd_useradd,
+            "userdel": self.cmd_userdel,
+            "passwd": self.cmd_passwd,
+            "whoami": self.cmd_whoami,
+            "logout": self.cmd_logout,
+            "users": self.cmd_users,
+            "chmod": self.cmd_chmod,
+            # Text processing commands for pipelines
+            "grep": self.cmd_grep,
+            "sort": self.cmd_sort,
+            # Directory commands
+            "cd": self.cmd_cd,
+            "pwd": self.cmd_pwd,
+            "ls": self.cmd_ls,
+            "mkdir": self.cmd_mkdir,
+            "rmdir": self.cmd_rmdir,
+            # File commands
+            "cat": self.cmd_cat,
+            "touch": self.cmd_touch,
+            "rm": self.cmd_rm,
+            # System commands
+            "echo": self.cmd_echo,
+            "clear": self.cmd_clear,
+            "sleep": self.cmd_sleep,
+            "jobs": self.cmd_jobs,
+            "bg": self.cmd_bg,
+            "fg": self.cmd_fg,
+            "kill": self.cmd_kill,
+            "history": self.show_history,
+            # Simulation commands
+            "roundrobin": self.cmd_roundrobin,
+            "priority": self.cmd_priority,
+            "paging": self.cmd_paging,
+            "philosophers": self.cmd_philosophers,
+            "exit": self.cmd_exit,
+            "help": self.show_help,
+        }
+        
+        # Pipeline stages that can pass lines on as an iterator
+        self._filters = {
+            "grep": self._grep_lines,
+            "sort": self._sort_lines,
+        }
+        
+    @property
+    def cwd(self):
+        """Current working directory"""
+        return self._cwd
+    
+    @cwd.setter
+    def cwd(self, path):
+        self._cwd = path
+        # Prefix for relative paths, so resolving one is a single concatenation
+        self._cwd_sep = path if path.endswith(os.sep) else path + os.sep
+        # Directory name shown in the prompt
+        self._cwd_base = os.path.basename(path)
+    
+    def _abs_path(self, path):
+        """Resolve path against the current directory (same result as os.path.join)"""
+        return path if os.path.isabs(path) else self._cwd_sep + path
+    
+    @staticmethod
+    def _parent_dir(abs_path):
+        """Parent directory of an absolute path"""
+        # dirname honours os.altsep, so 'sub/child' works on Windows too
+        return os.path.dirname(abs_path) or os.sep
+    
+    def _set_prompt_template(self):
+        """Cache the prompt for the logged-in user; only the directory varies"""
+        # Escape braces so str.format only fills in the directory
+        username = self.user_manager.current_user.username.replace("{", "{{").replace("}", "}}")
+        if self._use_color:
+            self._prompt_tpl = f"\033[1;36m{username}\033[0m@\033[1;32m{{d}}\033[0m$ "
+        else:
+            self._prompt_tpl = f"{username}@{{d}}$ "
+    
     def start(self):
         """Start the shell with login"""
         print("Welcome to Python Shell Simulator")
@@ -28,51 +206,37 @@ class Shell:
             print("Login required. Exiting...")
             return
         
+        self._set_prompt_template()
         print("\nType 'help' to see available commands")
-        self.run()
+        try:
+            self.run()
+        finally:
+            self.user_manager.close()
+            self.permission_manager.close()
     
     def run(self):
         """Main shell loop"""
         while self.running:
             try:
                 # Display prompt with current directory and username
-                username = self.user_manager.current_user.username
-                user_prefix = f"\033[1;36m{username}\033[0m@" if os.name != 'nt' else f"{username}@"
-                dir_suffix = f"\033[1;32m{os.path.basename(self.cwd)}\033[0m$ " if os.name != 'nt' else f"{os.path.basename(self.cwd)}$ "
-                prompt = f"{user_prefix}{dir_suffix}"
-                
-                user_input = input(prompt)
+                user_input = input(self._prompt_tpl.format(d=self._cwd_base))
                 
                 if not user_input.strip():
                     continue
                 
                 self.cmd_history.append(user_input)
+                known = self.parser.known_commands
+                
+                # One tokenization; a command without pipes is a one-stage pipeline
+                pipeline = self.parser.parse_any(user_input)
                 
-                # Check if the command includes pipes
-                if "|" in user_input:
-                    # Parse as pipeline
-                    pipeline = self.parser.parse_pipeline(user_input)
-                    
-                    # Validate each command in the pipeline
-                    valid_pipeline = True
-                    for cmd, _ in pipeline:
-                        if not self.parser.validate_command(cmd) and cmd:
-                            print(f"Command not found: {cmd}")
-                            valid_pipeline = False
-                            break
-                    
-                    if valid_pipeline:
-                        self.execute_pipeline(pipeline)
-                else:
-                    # Regular command execution
-                    command, args = self.parser.parse(user_input)
-                    
-                    # Validate the command
-                    if not self.parser.validate_command(command) and command:
-                        print(f"Command not found: {command}")
-                        continue
-                        
-                    self.execute_command(command, args)
+                # Validate every command in the pipeline in one pass
+                bad = next((cmd for cmd, _ in pipeline if cmd and cmd not in known), None)
+                if bad is not None:
+                    print(f"Command not found: {bad}")
+                    continue
+                
+                self.execute_pipeline(pipeline)
                 
             except KeyboardInterrupt:
                 print("\nUse 'exit' to quit the shell")
@@ -84,275 +248,260 @@ class Shell:
         if not pipeline:
             return
         
+        # A plain command: nothing to capture or stream
+        if len(pipeline) == 1:
+            command, args = pipeline[0]
+            self.execute_command(command, args)
+            return
+        
         # Start with no input
         input_data = None
         
         # Process each command in the pipeline
         for i, (command, args) in enumerate(pipeline):
+            line_filter = self._filters.get(command)
+            if line_filter is None and input_data is not None and not isinstance(input_data, str):
+                # Only grep/sort consume streamed lines; others get text
+                input_data = "".join(f"{line}\n" for line in input_data)
+            
             # If not the last command, capture output
             if i < len(pipeline) - 1:
-                # Redirect stdout to capture output
-                original_stdout = sys.stdout
-                captured_output = io.StringIO()
-                sys.stdout = captured_output
-                
-                # Execute the command
-                self.execute_command(command, args, input_data)
+                if line_filter is not None:
+                    # Chain lazily; lines flow once a later stage pulls them
+                    input_data = line_filter(args, input_data)
+                    if input_data is None:
+                        return
+                    continue
                 
-                # Get the output and restore stdout
-                sys.stdout = original_stdout
-                input_data = captured_output.getvalue()
-                captured_output.close()
+                # Handlers append to the buffer through `out`; anything a
+                # command module prints directly is collected into it too
+                buf = []
+                with contextlib.redirect_stdout(_ListWriter(buf)):
+                    self.execute_command(command, args, input_data, buf.append)
+                input_data = "".join(buf)
             else:
                 # Last command, output to terminal
                 self.execute_command(command, args, input_data)
     
-    def execute_command(self, command, args, input_data=None):
-        """Execute the given command with arguments"""
-        # User management commands
-        if command == "useradd":
-            self.cmd_useradd(args)
+    def _cached_check(self, path, permission):
+        """check_file_permission for the current user, memoized per path"""
+        user = self.user_manager.current_user
+        key = (path, user.username, user.permission_level, permission.value)
+        cache = self._perm_cache
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+            return result
+        
+        result = check_file_permission(path, user, self.permission_manager, permission)
+        cache[key] = result
+        if len(cache) > self.PERM_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+    
+    def _invalidate_path(self, path):
+        """Drop cached permission results for a path that was created or removed"""
+        for key in [key for key in self._perm_cache if key[0] == path]:
+            del self._perm_cache[key]
+    
+    def execute_command(self, command, args, input_data=None, out=None):
+        """
+        Execute the given command with arguments
+        
+        Args:
+            command: Command name
+            args: Command arguments
+            input_data: Output of the previous pipeline stage, if any
+            out: Callable receiving output text; defaults to sys.stdout.write
+        """
+        handler = self._dispatch.get(command)
+        if handler is not None:
+            handler(args, input_data, out or sys.stdout.write)
+        elif command:
+            print(f"Command not implemented: {command}")
+    
+    # Directory command implementations
+    def cmd_cd(self, args, input_data, out):
+        """Change the current directory"""
+        self.cwd = change_directory(self.cwd, args)
+    
+    def cmd_pwd(self, args, input_data, out):
+        """Print the current directory"""
+        print_working_directory(self.cwd)
+    
+    def cmd_ls(self, args, input_data, out):
+        """List a directory after checking read permission"""
+        # Check directory permissions before listing
+        target_dir = self._abs_path(args[0]) if args else self.cwd
+        
+        has_perm, error = self._cached_check(target_dir, _READ)
+        
+        if not has_perm:
+            print(error)
             return
-        elif command == "userdel":
-            self.cmd_userdel(args)
+        
+        list_directory(self.cwd, args)
+    
+    def cmd_mkdir(self, args, input_data, out):
+        """Create a directory after checking write permission on its parent"""
+        # Check parent directory permissions
+        if not args:
+            print("Error: mkdir requires a directory name")
             return
-        elif command == "passwd":
-            self.cmd_passwd(args)
+        
+        dir_path = self._abs_path(args[0])
+        parent_dir = self._parent_dir(dir_path)
+        
+        has_perm, error = self._cached_check(parent_dir, _WRITE)
+        
+        if not has_perm:
+            print(error)
             return
-        elif command == "whoami":
-            self.cmd_whoami()
+        
+        make_directory(self.cwd, args)
+        self._invalidate_path(dir_path)
+    
+    def cmd_rmdir(self, args, input_data, out):
+        """Remove a directory after checking write permission"""
+        if not args:
+            print("Error: rmdir requires a directory name")
             return
-        elif command == "logout":
-            self.cmd_logout()
+        
+        dir_path = self._abs_path(args[0])
+        
+        has_perm, error = self._cached_check(dir_path, _WRITE)
+        
+        if not has_perm:
+            print(error)
             return
-        elif command == "users":
-            self.cmd_users()
+        
+        remove_directory(self.cwd, args)
+        self._invalidate_path(dir_path)
+    
+    # File command implementations with permission checks
+    def cmd_cat(self, args, input_data, out):
+        """Print a file, or pass piped input through"""
+        if input_data:
+            # If we have input data from a pipe, pass it through
+            out(input_data)
             return
-        elif command == "chmod":
-            self.cmd_chmod(args)
+        
+        if not args:
+            print("Error: cat requires a filename")
             return
-            
-        # Text processing commands for pipelines
-        elif command == "grep":
-            self.cmd_grep(args, input_data)
+        
+        filepath = self._abs_path(args[0])
+        
+        has_perm, error = self._cached_check(filepath, _READ)
+        
+        if not has_perm:
+            print(error)
             return
-        elif command == "sort":
-            self.cmd_sort(args, input_data)
+        
+        cat(self.cwd, args)
+    
+    def cmd_touch(self, args, input_data, out):
+        """Create or update a file after checking write permission on its parent"""
+        if not args:
+            print("Error: touch requires a filename")
             return
-            
-        # Directory commands
-        if command == "cd":
-            from .commands.directory_commands import change_directory
-            self.cwd = change_directory(self.cwd, args)
-        elif command == "pwd":
-            from .commands.directory_commands import print_working_directory
-            print_working_directory(self.cwd)
-        elif command == "ls":
-            # Check directory permissions before listing
-            target_dir = self.cwd
-            if args:
-                path = args[0]
-                if os.path.isabs(path):
-                    target_dir = path
-                else:
-                    target_dir = os.path.join(self.cwd, path)
-            
-            has_perm, error = check_file_permission(
-                target_dir, 
-                self.user_manager.current_user,
-                self.permission_manager,
-                FilePermission.READ
-            )
-            
-            if not has_perm:
-                print(error)
-                return
-            
-            from .commands.directory_commands import list_directory
-            list_directory(self.cwd, args)
-        elif command == "mkdir":
-            # Check parent directory permissions
-            if not args:
-                print("Error: mkdir requires a directory name")
-                return
-                
-            path = args[0]
-            parent_dir = os.path.dirname(os.path.join(self.cwd, path)) or self.cwd
-            
-            has_perm, error = check_file_permission(
-                parent_dir, 
-                self.user_manager.current_user,
-                self.permission_manager,
-                FilePermission.WRITE
-            )
-            
-            if not has_perm:
-                print(error)
-                return
-                
-            from .commands.directory_commands import make_directory
-            make_directory(self.cwd, args)
-        elif command == "rmdir":
-            if not args:
-                print("Error: rmdir requires a directory name")
-                return
-                
-            path = args[0]
-            dir_path = os.path.join(self.cwd, path)
-                
-            has_perm, error = check_file_permission(
-                dir_path, 
-                self.user_manager.current_user,
-                self.permission_manager,
-                FilePermission.WRITE
-            )
-            
-            if not has_perm:
-                print(error)
-                return
-                
-            from .commands.directory_commands import remove_directory
-            remove_directory(self.cwd, args)
-        
-        # File commands with permission checks
-        elif command == "cat":
-            if input_data:
-                # If we have input data from a pipe, print it
-                print(input_data, end='')
-                return
-            
-            if not args:
-                print("Error: cat requires a filename")
-                return
-                
-            filename = args[0]
-            filepath = os.path.join(self.cwd, filename)
-                
-            has_perm, error = check_file_permission(
-                filepath,
-                self.user_manager.current_user,
-                self.permission_manager,
-                FilePermission.READ
-            )
-            
-            if not has_perm:
-                print(error)
-                return
-                
-            from .commands.file_commands import cat
-            cat(self.cwd, args)
-        elif command == "touch":
-            if not args:
-                print("Error: touch requires a filename")
-                return
-                
-            filename = args[0]
-            filepath = os.path.join(self.cwd, filename)
-            parent_dir = os.path.dirname(filepath) or self.cwd
-                
-            has_perm, error = check_file_permission(
-                parent_dir,
-                self.user_manager.current_user,
-                self.permission_manager,
-                FilePermission.WRITE
-            )
-            
-            if not has_perm:
-                print(error)
-                return
-                
-            from .commands.file_commands import touch
-            touch(self.cwd, args)
-        elif command == "rm":
-            if not args:
-                print("Error: rm requires a filename")
-                return
-                
-            filename = args[0]
-            filepath = os.path.join(self.cwd, filename)
-                
-            has_perm, error = check_file_permission(
-                filepath,
-                self.user_manager.current_user,
-                self.permission_manager,
-                FilePermission.WRITE
-            )
-            
-            if not has_perm:
-                print(error)
-                return
-                
-            from .commands.file_commands import remove_file
-            remove_file(self.cwd, args)
         
-        # System commands
-        elif command == "echo":
-            if input_data:
-                print(input_data, end='')
-            else:
-                from .commands.system_commands import echo
-                echo(args)
-        elif command == "clear":
-            from .commands.system_commands import clear_screen
-            clear_screen()
-        elif command == "sleep":
-            from .commands.system_commands import sleep_command
-            sleep_command(args)
-        elif command == "jobs":
-            from .commands.system_commands import jobs_command
-            jobs = jobs_command()
-            print(jobs)
-        elif command == "bg":
-            from .commands.system_commands import bg_command
-            bg_command(args)
-        elif command == "fg":
-            from .commands.system_commands import fg_command
-            fg_command(args)
-        elif command == "kill":
-            from .commands.system_commands import kill_process
-            kill_process(args)
-        elif command == "history":
-            for i, cmd in enumerate(self.cmd_history):
-                print(f"{i+1}: {cmd}")
-            
-        # Scheduling simulation commands
-        elif command == "roundrobin":
-            from .commands.scheduler_commands import simulate_round_robin
-            result = simulate_round_robin(args)
-            print(result)
-        elif command == "priority":
-            from .commands.scheduler_commands import simulate_priority
-            result = simulate_priority(args)
-            print(result)
-            
-        # Memory management simulation command
-        elif command == "paging":
-            from .commands.memory_commands import simulate_memory_paging
-            simulate_memory_paging(args)
-            
-        # Process synchronization commands
-        elif command == "philosophers":
-            from .commands.synchronization_commands import simulate_dining_philosophers
-            result = simulate_dining_philosophers(args)
-            print(result)
-            
-        elif command == "exit":
-            self.running = False
-            print("Exiting shell...")
-        elif command == "help":
-            self.show_help()
-        elif command:
-            print(f"Command not implemented: {command}")
+        filepath = self._abs_path(args[0])
+        parent_dir = self._parent_dir(filepath)
+        
+        has_perm, error = self._cached_check(parent_dir, _WRITE)
+        
+        if not has_perm:
+            print(error)
+            return
+        
+        touch(self.cwd, args)
+        self._invalidate_path(filepath)
     
-    # User management command implementations
-    def cmd_useradd(self, args):
-        """Add a new user"""
-        current_user = self.user_manager.current_user
+    def cmd_rm(self, args, input_data, out):
+        """Remove a file after checking write permission"""
+        if not args:
+            print("Error: rm requires a filename")
+            return
+        
+        filepath = self._abs_path(args[0])
+        
+        has_perm, error = self._cached_check(filepath, _WRITE)
         
-        if current_user.permission_level != PermissionLevel.ADMIN:
-            print("Error: Only administrators can add users")
+        if not has_perm:
+            print(error)
             return
-            
+        
+        remove_file(self.cwd, args)
+        self._invalidate_path(filepath)
+    
+    # System command implementations
+    def cmd_echo(self, args, input_data, out):
+        """Echo arguments, or pass piped input through"""
+        if input_data:
+            out(input_data)
+        else:
+            echo(args)
+    
+    def cmd_clear(self, args, input_data, out):
+        """Clear the screen"""
+        clear_screen()
+    
+    def cmd_sleep(self, args, input_data, out):
+        """Sleep in the foreground or background"""
+        sleep_command(args)
+    
+    def cmd_jobs(self, args, input_data, out):
+        """List background jobs"""
+        jobs = jobs_command()
+        out(f"{jobs}\n")
+    
+    def cmd_bg(self, args, input_data, out):
+        """Resume a stopped job"""
+        bg_command(args)
+    
+    def cmd_fg(self, args, input_data, out):
+        """Bring a job to the foreground"""
+        fg_command(args)
+    
+    def cmd_kill(self, args, input_data, out):
+        """Kill a process by PID"""
+        kill_process(args)
+    
+    def cmd_exit(self, args, input_data, out):
+        """Stop the shell loop"""
+        self.running = False
+        print("Exiting shell...")
+    
+    def show_history(self, args, input_data, out):
+        """Display command history"""
+        for i, cmd in enumerate(self.cmd_history):
+            out(f"{i+1}: {cmd}\n")
+    
+    # Simulation command implementations
+    def cmd_roundrobin(self, args, input_data, out):
+        """Run the Round Robin scheduling simulation"""
+        result = simulate_round_robin(args)
+        out(f"{result}\n")
+    
+    def cmd_priority(self, args, input_data, out):
+        """Run the Priority scheduling simulation"""
+        result = simulate_priority(args)
+        out(f"{result}\n")
+    
+    def cmd_paging(self, args, input_data, out):
+        """Run the memory paging simulation"""
+        simulate_memory_paging(args)
+    
+    def cmd_philosophers(self, args, input_data, out):
+        """Run the dining philosophers simulation"""
+        result = simulate_dining_philosophers(args)
+        out(f"{result}\n")
+    
+    # User management command implementations
+    @_require_admin("add users")
+    def cmd_useradd(self, args, input_data, out):
+        """Add a new user"""
         if len(args) < 2:
             print("Usage: useradd <username> <permission_level>")
             print("Permission levels: USER, STANDARD, ADMIN")
@@ -373,14 +522,11 @@ class Shell:
         else:
             print(f"Failed to add user '{username}'")
     
-    def cmd_userdel(self, args):
+    @_require_admin("delete users")
+    def cmd_userdel(self, args, input_data, out):
         """Delete a user"""
         current_user = self.user_manager.current_user
         
-        if current_user.permission_level != PermissionLevel.ADMIN:
-            print("Error: Only administrators can delete users")
-            return
-            
         if not args:
             print("Usage: userdel <username>")
             return
@@ -396,13 +542,13 @@ class Shell:
         else:
             print(f"Failed to delete user '{username}'")
     
-    def cmd_passwd(self, args):
+    def cmd_passwd(self, args, input_data, out):
         """Change password"""
         current_user = self.user_manager.current_user
         
         if args:
             # Changing another user's password requires admin
-            if current_user.permission_level != PermissionLevel.ADMIN:
+            if current_user.permission_level is not _ADMIN:
                 print("Error: Only administrators can change other users' passwords")
                 return
                 
@@ -423,54 +569,46 @@ class Shell:
         else:
             print(f"Failed to change password for '{username}'")
     
-    def cmd_whoami(self):
+    def cmd_whoami(self, args, input_data, out):
         """Show current user information"""
         current_user = self.user_manager.current_user
-        print(f"Username: {current_user.username}")
-        print(f"Permission level: {current_user.permission_level.name}")
+        out(f"Username: {current_user.username}\n"
+            f"Permission level: {current_user.permission_level.name}\n")
     
-    def cmd_logout(self):
+    def cmd_logout(self, args, input_data, out):
         """Log out the current user"""
         self.user_manager.logout()
+        self._perm_cache.clear()
         print("Logged out")
         
         # Prompt for new login
         if not self.user_manager.login():
             self.running = False
             print("Exiting shell...")
+            return
+        
+        self._set_prompt_template()
     
-    def cmd_users(self):
+    @_require_admin("list all users")
+    def cmd_users(self, args, input_data, out):
         """List all users"""
-        current_user = self.user_manager.current_user
-        
-        if current_user.permission_level != PermissionLevel.ADMIN:
-            print("Error: Only administrators can list all users")
-            return
-            
         users = self.user_manager.get_users_list()
-        print("Users:")
+        out("Users:\n")
         for user in users:
-            print(f"  {user['username']} ({user['permission_level']})")
+            out(f"  {user['username']} ({user['permission_level']})\n")
     
-    def cmd_chmod(self, args):
+    @_require_admin("change file permissions")
+    def cmd_chmod(self, args, input_data, out):
         """Change file permissions"""
-        current_user = self.user_manager.current_user
-        
-        if current_user.permission_level != PermissionLevel.ADMIN:
-            print("Error: Only administrators can change file permissions")
-            return
-            
         if len(args) < 3:
             print("Usage: chmod <username> <r|w|x|rwx> <filepath>")
             return
             
         username = args[0]
         perm_str = args[1].lower()
-        filepath = args[2]
         
         # Convert relative path to absolute
-        if not os.path.isabs(filepath):
-            filepath = os.path.join(self.cwd, filepath)
+        filepath = self._abs_path(args[2])
             
         if not os.path.exists(filepath):
             print(f"Error: File not found: {filepath}")
@@ -490,133 +628,155 @@ class Shell:
             return
             
         if self.permission_manager.set_permissions(filepath, username, permissions):
+            self._perm_cache.clear()
             print(f"Changed permissions for '{username}' on '{filepath}'")
         else:
             print(f"Failed to change permissions")
     
-    def show_help(self):
+    def show_help(self, args, input_data, out):
         """Display help information"""
-        print("\nAvailable commands:")
-        print("\nFile Operations:")
-        print("  ls [dir]           - List directory contents")
-        print("  cat <file>         - Display file contents")
-        print("  touch <file>       - Create an empty file")
-        print("  rm <file>          - Remove file")
-        
-        print("\nDirectory Operations:")
-        print("  pwd                - Print working directory")
-        print("  cd <dir>           - Change directory")
-        print("  mkdir <dir>        - Create directory")
-        print("  rmdir <dir>        - Remove directory")
-        
-        print("\nUser Management:")
-        print("  whoami             - Display current user")
-        print("  logout             - Log out current user")
-        print("  passwd [user]      - Change password")
-        print("  useradd <user> <level> - Add new user (admin)")
-        print("  userdel <user>     - Remove user (admin)")
-        print("  users              - List all users (admin)")
-        print("  chmod <user> <perms> <file> - Set file permissions (admin)")
-        
-        print("\nText Processing:")
-        print("  grep <pattern> [file] - Search for pattern")
-        print("  sort [file]        - Sort lines of text")
-        
-        print("\nSystem Commands:")
-        print("  echo <text>        - Display text")
-        print("  clear              - Clear screen")
-        print("  history            - Show command history")
-        print("  exit               - Exit shell")
-        
-        print("\nSimulation Commands:")
-        print("  philosophers       - Run Dining Philosophers simulation")
-        print("  paging             - Run Memory Paging simulation")
-        print("  roundrobin         - Run Round Robin scheduling simulation")
-        print("  priority           - Run Priority scheduling simulation")
-        
-        print("\nPipe Support:")
-        print("  command1 | command2 | command3  - Chain commands with pipes")
-    
-    def cmd_grep(self, args, input_data=None):
-        """
-        Filter input lines containing pattern
-        
-        Args:
-            args: Command arguments [pattern, filename?]
-            input_data: Input from previous command in pipeline
-        """
-        if not args:
-            print("Error: grep requires a pattern")
-            return
-        
-        pattern = args[0]
+        out(_HELP_TEXT)
+    
+    def _pipe_lines(self, input_data):
+        """Return piped input as an iterable of lines, or None if nothing was piped"""
+        # Lines streamed from a previous grep/sort stage
+        if input_data is not None and not isinstance(input_data, str):
+            return input_data
         
-        # If we have input from a pipe
+        # Text captured from a previous stage
         if input_data:
-            lines = input_data.splitlines()
-            for line in lines:
-                if pattern in line:
-                    print(line)
-            return
+            return input_data.splitlines()
         
-        # Otherwise read from a file
-        if len(args) < 2:
-            print("Error: grep requires a filename when not in a pipeline")
-            return
-        
-        filename = args[1]
+        return None
+    
+    def _file_arg(self, file_args, command):
+        """Resolve the file operand of a text processing command, or None after an error"""
+        if not file_args:
+            print(f"Error: {command} requires a filename when not in a pipeline")
+            return None
         
         # Handle relative paths
-        if not os.path.isabs(filename):
-            filename = os.path.join(self.cwd, filename)
-        
+        return self._abs_path(file_args[0])
+    
+    def _read_lines(self, filename, mode='r', buffering=-1):
+        """Yield the lines of a file lazily, reporting errors when it is read"""
+        try:
+            with open(filename, mode, buffering=buffering) as file:
+                yield from file
+        except FileNotFoundError:
+            print(f"Error: File not found: {filename}")
+        except PermissionError:
+            print(f"Error: Permission denied: {filename}")
+        except Exception as e:
+            handle_error(e)
+    
+    def _read_text(self, filename):
+        """Read a whole text file, or return None after reporting an error"""
         try:
-            with open(filename, 'r') as file:
-                for line in file:
-                    if pattern in line:
-                        print(line.rstrip())
+            with open(filename, 'r', buffering=_READ_BUF_SIZE) as file:
+                return file.read()
         except FileNotFoundError:
             print(f"Error: File not found: {filename}")
         except PermissionError:
             print(f"Error: Permission denied: {filename}")
         except Exception as e:
             handle_error(e)
+        return None
+    
+    def _grep_lines(self, args, input_data):
+        """Lazily filter input lines matching pattern; None on usage error"""
+        # -E selects a regular expression; otherwise the pattern is a literal
+        use_regex = bool(args) and args[0] == "-E"
+        if use_regex:
+            args = args[1:]
+        
+        if not args:
+            print("Error: grep requires a pattern")
+            return None
+        
+        pattern = args[0]
+        lines = self._pipe_lines(input_data)
+        from_file = lines is None
+        if from_file:
+            filename = self._file_arg(args[1:], "grep")
+            if filename is None:
+                return None
+            lines = self._read_lines(filename, 'rb', _READ_BUF_SIZE)
+            if use_regex:
+                # Regexes must see text, as with piped input, or '.' and
+                # '\w' would match bytes rather than characters
+                lines = (line.decode(errors='replace').rstrip('\r\n') for line in lines)
+            else:
+                # A literal can be matched on the raw bytes; decode only the hits
+                pattern = pattern.encode()
+        
+        if use_regex:
+            try:
+                search = re.compile(pattern).search
+            except re.error as e:
+                print(f"Error: Invalid pattern: {e}")
+                return None
+            matched = filter(search, lines)
+            if from_file:
+                return (line.rstrip() for line in matched)
+            return matched
+        elif isinstance(lines, list):
+            # Text already split into a list: filter it in one comprehension
+            matched = [line for line in lines if pattern in line]
+        else:
+            matched = (line for line in lines if pattern in line)
+        
+        if from_file:
+            return (line.decode(errors='replace').rstrip() for line in matched)
+        return matched
     
-    def cmd_sort(self, args, input_data=None):
+    def _sort_lines(self, args, input_data):
+        """Sort input lines; None on usage error"""
+        lines = self._pipe_lines(input_data)
+        if lines is None:
+            filename = self._file_arg(args, "sort")
+            if filename is None:
+                return None
+            text = self._read_text(filename)
+            if text is None:
+                return None
+            lines = text.splitlines()
+        elif not isinstance(lines, list):
+            lines = list(lines)
+        
+        # Every list here is private to this pipeline stage, so sort in place
+        lines.sort()
+        return lines
+    
+    def cmd_grep(self, args, input_data, out):
         """
-        Sort lines of text
+        Filter input lines containing pattern
         
         Args:
-            args: Command arguments [filename?]
+            args: Command arguments [-E?, pattern, filename?]
             input_data: Input from previous command in pipeline
+            out: Callable receiving output text
         """
-        # If we have input from a pipe
-        if input_data:
-            lines = input_data.splitlines()
-            for line in sorted(lines):
-                print(line)
+        lines = self._grep_lines(args, input_data)
+        if lines is None:
             return
         
-        # Otherwise read from a file
-        if not args:
-            print("Error: sort requires a filename when not in a pipeline")
-            return
-        
-        filename = args[0]
-        
-        # Handle relative paths
-        if not os.path.isabs(filename):
-            filename = os.path.join(self.cwd, filename)
+        matched = lines if isinstance(lines, list) else list(lines)
+        if matched:
+            out("\n".join(matched))
+            out("\n")
+    
+    def cmd_sort(self, args, input_data, out):
+        """
+        Sort lines of text
         
-        try:
-            with open(filename, 'r') as file:
-                lines = file.readlines()
-                for line in sorted(lines):
-                    print(line.rstrip())
-        except FileNotFoundError:
-            print(f"Error: File not found: {filename}")
-        except PermissionError:
-            print(f"Error: Permission denied: {filename}")
-        except Exception as e:
-            handle_error(e)
+        Args:
+            args: Command arguments [filename?]
+            input_data: Input from previous command in pipeline
+            out: Callable receiving output text
+        """
+        lines = self._sort_lines(args, input_data)
+        if lines:
+            out("\n".join(lines))
+            out("\n")
 
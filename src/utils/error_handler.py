@@ -2,12 +2,25 @@
 Utilities package initialization
 """
 import sys
-import traceback
+import atexit
 
 class ErrorHandler:
+    def __init__(self, log_path="error_log.txt"):
+        self.log_path = log_path
+        self._log_file = None  # Opened on first use and kept open
+    
     def log_error(self, error_message):
-        with open("error_log.txt", "a") as log_file:
-            log_file.write(f"ERROR: {error_message}\n")
+        if self._log_file is None:
+            # Line buffered, so each entry still reaches disk as it is logged
+            self._log_file = open(self.log_path, "a", buffering=1)
+            atexit.register(self.close)
+        self._log_file.write(f"ERROR: {error_message}\n")
+    
+    def close(self):
+        """Close the log file if it was opened"""
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
 
     def display_error(self, error_message):
         print(f"An error occurred: {error_message}")
@@ -23,10 +36,13 @@ def handle_error(error, show_traceback=False):
     error_type = type(error).__name__
     error_msg = str(error)
     
+    # One pre-joined write to stderr per error
     if error_msg:
-        print(f"Error ({error_type}): {error_msg}")
+        sys.stderr.write(f"Error ({error_type}): {error_msg}\n")
     else:
-        print(f"An error occurred: {error_type}")
+        sys.stderr.write(f"An error occurred: {error_type}\n")
     
     if show_traceback:
+        # Only pay for the traceback module when a traceback is wanted
+        import traceback
         traceback.print_exception(type(error), error, error.__traceback__)
\ No newline at end of file
@@ -1,15 +1,22 @@
+import platform as _platform
+
+# The platform cannot change while the process runs, so look it up once
+_PLATFORM = _platform.system()
+_SEP = "\\" if _PLATFORM == "Windows" else "/"
+# Maps both separators to the native one in a single translate pass
+_NORM_TABLE = str.maketrans({"/": _SEP, "\\": _SEP})
+
 def get_platform():
-    import platform
-    return platform.system()
+    return _PLATFORM
 
 def is_windows():
-    return get_platform() == "Windows"
+    return _PLATFORM == "Windows"
 
 def is_linux():
-    return get_platform() == "Linux"
+    return _PLATFORM == "Linux"
 
 def get_path_separator():
-    return "\\" if is_windows() else "/"
+    return _SEP
 
 def normalize_path(path):
-    return path.replace("/", get_path_separator()).replace("\\", get_path_separator())
\ No newline at end of file
+    return path.translate(_NORM_TABLE)
\ No newline at end of file